@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import User, Product, Purchase, Sale, Expense, Report, Setting
+from .models import (
+    User, Product, Purchase, Sale, Expense, Report, Setting, Totals, DailySummary, TableVersion, StockAlert,
+    StockMovement, StockSnapshot, TokenRevocation,
+)
 
 admin.site.register(User)
 admin.site.register(Product)
@@ -8,3 +11,10 @@ admin.site.register(Sale)
 admin.site.register(Expense)
 admin.site.register(Report)
 admin.site.register(Setting)
+admin.site.register(Totals)
+admin.site.register(DailySummary)
+admin.site.register(TableVersion)
+admin.site.register(StockAlert)
+admin.site.register(StockMovement)
+admin.site.register(StockSnapshot)
+admin.site.register(TokenRevocation)
@@ -0,0 +1,148 @@
+import asyncio
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from . import live
+from .authentication import ClaimsJWTAuthentication
+from .models import Totals
+from .views import (
+    ProductViewSet, PurchaseViewSet, SaleViewSet, ExpenseViewSet, ReportViewSet,
+    overview_payload, recent_activity_querysets, report_days,
+)
+
+# The list endpoints served on the async path; each reuses its viewset's
+# queryset, filters, permissions and serializer.
+ASYNC_LISTS = {
+    'products': ProductViewSet,
+    'purchases': PurchaseViewSet,
+    'sales': SaleViewSet,
+    'expenses': ExpenseViewSet,
+    'reports': ReportViewSet,
+}
+HEARTBEAT_INTERVAL = 15  # seconds; keeps idle streams open through proxies
+
+
+# ---------------------
+# Helpers
+# ---------------------
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return json_response(detail, status=exc.status_code)
+
+
+async def authenticate(request, query_token=False):
+    """The DRF request for ``request`` with ``user`` set, or raise
+    NotAuthenticated. Claims-based tokens make this a cache read at most.
+
+    ``query_token`` also accepts ``?token=``, for EventSource, which can't
+    send headers."""
+    drf_request = Request(request, authenticators=[])
+    if query_token and 'token' in request.GET and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f"Bearer {request.GET['token']}"
+    result = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+    if result is None:
+        raise exceptions.NotAuthenticated()
+    drf_request.user = result[0]
+    return drf_request
+
+
+def api_async(view):
+    """Turn DRF exceptions raised by an async view into JSON responses."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({'detail': 'Method not allowed.'}, status=405)
+        try:
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return error_response(exc)
+    return wrapper
+
+
+async def evaluate(queryset):
+    return [row async for row in queryset]
+
+
+async def overview_data():
+    # Independent reads go out together instead of one after another
+    sales, purchases, expenses = recent_activity_querysets()
+    totals, sales, purchases, expenses = await asyncio.gather(
+        Totals.objects.filter(pk=Totals.SINGLETON_ID).afirst(),
+        evaluate(sales), evaluate(purchases), evaluate(expenses),
+    )
+    if totals is None:
+        totals = await sync_to_async(Totals.rebuild)()
+    return overview_payload(totals, sales, purchases, expenses)
+
+
+# ---------------------
+# Async Read Endpoints
+# ---------------------
+@api_async
+async def overview(request):
+    await authenticate(request)
+    return json_response(await overview_data())
+
+
+@api_async
+async def overview_stream(request):
+    """Server-Sent Events: the full overview once, then an ``update`` event
+    (stats plus new activity entries) per committed sale, purchase or
+    expense. Needs the ASGI server; every open dashboard shares one event
+    per write instead of recomputing the overview on a poll."""
+    await authenticate(request, query_token=True)
+    live.hub.connect()
+    queue = live.hub.open()
+
+    async def events():
+        try:
+            yield b'retry: 5000\n\n'
+            yield live.encode('overview', await overview_data())
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    frame = b': keep-alive\n\n'
+                if frame is None:  # dropped for falling behind
+                    return
+                yield frame
+        finally:
+            live.hub.close(queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_async
+async def report_dates(request):
+    drf_request = await authenticate(request)
+    if not drf_request.user.is_staff:
+        raise exceptions.PermissionDenied()
+
+    days, limit = report_days(request.GET)
+    unique_dates = await evaluate(days[:limit])
+    if limit:
+        unique_dates.reverse()
+    return json_response({'dates': [d.isoformat() for d in unique_dates]})
+
+
+@api_async
+async def record_list(request, resource):
+    viewset = ASYNC_LISTS.get(resource)
+    if viewset is None:
+        raise exceptions.NotFound()
+    drf_request = await authenticate(request)
+
+    view = viewset(request=drf_request, format_kwarg=None, action='list', kwargs={})
+    view.check_permissions(drf_request)
+    page = await sync_to_async(view.paginate_queryset)(view.filter_queryset(view.get_queryset()))
+    return json_response(view.get_paginated_response(view.get_serializer(page, many=True).data).data)
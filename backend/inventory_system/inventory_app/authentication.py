@@ -0,0 +1,131 @@
+import time
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .barcodes import LRUCache
+from .config import SharedVersion
+from .models import User, TokenRevocation
+
+# Everything the permission classes and views read off request.user
+CLAIM_FIELDS = ('username', 'is_admin', 'is_staff_user', 'is_active', 'is_staff', 'is_superuser')
+USER_CACHE_SIZE = 1024
+USER_CACHE_TIMEOUT = 60
+
+
+# ---------------------
+# Lightweight Users
+# ---------------------
+version = SharedVersion('auth-users')
+state = {'generation': None, 'revoked': {}}
+users = LRUCache(USER_CACHE_SIZE)  # str(user_id): (claim values, expiry), for tokens whose claims are not trusted
+
+
+def sync():
+    """Reload recent revocations and forget cached users once any process
+    changed a user; the version in the database is checked every few seconds."""
+    generation = version.get()
+    if state['generation'] != generation:
+        since = timezone.now() - api_settings.ACCESS_TOKEN_LIFETIME
+        revoked = TokenRevocation.objects.filter(revoked_at__gt=since).values_list('user_id', 'revoked_at')
+        users.clear()
+        state.update(generation=generation, revoked={str(user_id): at.timestamp() for user_id, at in revoked})
+
+
+def claims_for(user):
+    return {field: getattr(user, field) for field in CLAIM_FIELDS}
+
+
+def build_user(user_id, values):
+    """An unsaved-looking User carrying only the claim fields. Good for
+    permission checks and as a foreign key value; never ``save()`` it."""
+    user = User(pk=user_id, **values)
+    user._state.adding = False
+    user._state.db = 'default'
+    return user
+
+
+def cached_user(user_id):
+    cached = users.get(str(user_id))
+    if cached is None or cached[1] < time.monotonic():
+        values = User.objects.filter(pk=user_id).values(*CLAIM_FIELDS).first()
+        if values is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cached = (values, time.monotonic() + USER_CACHE_TIMEOUT)
+        users.set(str(user_id), cached)
+    return build_user(user_id, cached[0])
+
+
+def revoke(user_id):
+    """Stop trusting claims in tokens issued so far. The time goes in its own
+    table, which outlives a deleted user, and the shared version moves on, so
+    every process sees it. Runs from the User save and delete signals only;
+    a queryset ``update()`` on users bypasses it and must call it itself."""
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': timezone.now()})
+    version.bump()
+
+
+def user_changed(sender, instance, created=False, **kwargs):
+    if not created:  # a new user has no tokens yet
+        revoke(instance.pk)
+
+
+# ---------------------
+# Authentication
+# ---------------------
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds ``request.user`` from the token's claims.
+
+    Tokens issued before the user was last changed, or without the claims,
+    fall back to a lookup cached in this process until any user changes, so
+    no request reads the user table while nothing changes."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        sync()
+        revoked_at = state['revoked'].get(str(user_id))
+        trusted = all(field in validated_token for field in CLAIM_FIELDS) and (
+            revoked_at is None or validated_token.get('iat', 0) > revoked_at
+        )
+        if trusted:
+            user = build_user(user_id, {field: validated_token[field] for field in CLAIM_FIELDS})
+        else:
+            user = cached_user(user_id)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+# ---------------------
+# Token Serializers
+# ---------------------
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token.payload.update(claims_for(user))
+        return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @property
+    def access_token(self):
+        # Claims copied from the refresh token may be a day old; re-read them
+        access = super().access_token
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        values = User.objects.filter(pk=user_id).values(*CLAIM_FIELDS).first() or {}
+        access.payload.update(values)
+        return access
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
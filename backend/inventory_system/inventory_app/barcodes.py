@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from .config import SharedVersion
+from .models import Product
+
+CODE_CACHE_SIZE = 4096
+
+
+# ---------------------
+# LRU Cache
+# ---------------------
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            return self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+# ---------------------
+# Code -> Product
+# ---------------------
+# Only fields that change through Product.save are cached, so stock
+# movements (plain UPDATEs) never have to invalidate anything.
+CODE_FIELDS = ('id', 'sku', 'name', 'category', 'selling_price')
+
+codes = LRUCache(CODE_CACHE_SIZE)
+state = {'generation': None}
+version = SharedVersion('product-codes')
+
+
+def sync():
+    """Drop everything if any process changed products since we cached; the
+    version in the database is checked every few seconds."""
+    generation = version.get()
+    if state['generation'] != generation:
+        codes.clear()
+        state['generation'] = generation
+
+
+def remember(row):
+    codes.set(row['sku'], row)
+
+
+def lookup(code):
+    """Cached till fields for ``code``, or None. One unique-index lookup on a miss."""
+    sync()
+    row = codes.get(code)
+    if row is None:
+        row = Product.objects.filter(sku=code).values(*CODE_FIELDS).first()
+        if row is not None:
+            remember(row)
+    return row
+
+
+def product_ids(code_list):
+    """``{code: product_id}`` for the known codes, one query for all misses."""
+    sync()
+    found, missing = {}, []
+    for code in code_list:
+        row = codes.get(code)
+        if row is None:
+            missing.append(code)
+        else:
+            found[code] = row['id']
+    if missing:
+        for row in Product.objects.filter(sku__in=missing).values(*CODE_FIELDS):
+            remember(row)
+            found[row['sku']] = row['id']
+    return found
+
+
+def touch(stale_codes=None):
+    """Forget ``stale_codes`` (everything when None) in this process and move
+    the shared version on so other processes drop their copies."""
+    in_sync = state['generation'] == version.get(fresh=True)
+    if stale_codes is None:
+        codes.clear()
+    for code in stale_codes or ():
+        codes.pop(code)
+    generation = version.bump()
+    if in_sync:
+        state['generation'] = generation
+
+
+def product_changed(sender, instance, **kwargs):
+    # The new code plus whatever code this product was cached under before
+    with codes.lock:
+        stale = {code for code, row in codes.items.items() if row['id'] == instance.pk}
+    if instance.sku:
+        stale.add(instance.sku)
+    touch(stale)
@@ -0,0 +1,265 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from . import config, metrics
+from .authentication import ClaimsTokenObtainPairSerializer
+from .models import Product, User
+from .seeding import seed_bench
+
+# (sync WSGI path, async ASGI path) pairs serving the same data
+READ_PATHS = [
+    ('/api/overview/', '/api/async/overview/'),
+    ('/api/report_dates/', '/api/async/report_dates/'),
+    ('/api/products/', '/api/async/products/'),
+    ('/api/sales/', '/api/async/sales/'),
+]
+
+# The load suite's requests, made in this order once per round:
+# (name, method, path, body, saves). A body is built from the round's
+# context; ``saves`` names the context key the response's id is kept under,
+# for later paths such as ``{report}``.
+ENDPOINTS = [
+    ('overview', 'get', '/api/overview/', None, None),
+    ('report_dates', 'get', '/api/report_dates/', None, None),
+    ('timeseries', 'get', '/api/analytics/timeseries/?granularity=week', None, None),
+    ('products', 'get', '/api/products/', None, None),
+    ('sales', 'get', '/api/sales/?page_size=50', None, None),
+    ('purchases', 'get', '/api/purchases/?page_size=50', None, None),
+    ('expenses', 'get', '/api/expenses/?page_size=50', None, None),
+    ('reports', 'get', '/api/reports/?page_size=50', None, None),
+    ('sale_create', 'post', '/api/sales/', lambda context: {
+        'product': context['product'].pk, 'quantity': 1, 'price_per_unit': str(context['product'].selling_price),
+    }, None),
+    ('report_create', 'post', '/api/reports/', lambda context: {'notes': 'Load benchmark'}, 'report'),
+    ('report_pdf', 'get', '/api/reports/{report}/export_pdf/', None, None),
+]
+METRICS_MIDDLEWARE = 'inventory_app.metrics.MetricsMiddleware'
+# Cheap requests, where the metrics' fixed cost weighs the most
+METRICS_PATHS = ['/api/overview/', '/api/report_dates/', '/api/products/?page_size=50', '/api/sales/?page_size=50']
+LOAD_SIZES = (1000, 100000, 1000000)  # sales per run
+PRODUCTS_PER_SALE = 0.01
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+@contextmanager
+def throwaway_user():
+    """An admin made for one run and deleted after it. The name is new every
+    time, so an account that already exists is never touched."""
+    user = User.objects.create(username=f'bench-{uuid.uuid4().hex[:12]}', is_admin=True, is_staff=True)
+    try:
+        yield user
+    finally:
+        user.delete()
+
+
+def summarize(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+    }
+
+
+def bench_wsgi(path, headers, concurrency, total):
+    """``total`` GETs through the WSGI handler from ``concurrency`` threads."""
+    def worker(count):
+        client, latencies = Client(headers=headers), []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, (path, response.status_code)
+        return latencies
+
+    shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = [sample for result in pool.map(worker, shares) for sample in result]
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def bench_asgi(path, headers, concurrency, total):
+    """``total`` GETs through the ASGI handler, ``concurrency`` in flight."""
+    client, latencies = AsyncClient(), []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, (path, response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_read_path_benchmark(concurrency=16, requests=400, paths=READ_PATHS):
+    """Compare p50/p99 latency of the sync and async read paths at the same
+    concurrency, in process, against whatever data the database holds."""
+    with throwaway_user() as user:
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        results = []
+        for sync_path, async_path in paths:
+            bench_wsgi(sync_path, headers, concurrency, concurrency)  # warm up
+            results.append({
+                'wsgi': {'path': sync_path, **bench_wsgi(sync_path, headers, concurrency, requests)},
+                'asgi': {'path': async_path, **asyncio.run(bench_asgi(async_path, headers, concurrency, requests))},
+            })
+        return {'concurrency': concurrency, 'results': results}
+
+
+# ---------------------
+# Load Suite
+# ---------------------
+def call(client, endpoint, context):
+    name, method, path, body, saves = endpoint
+    path = path.format(**context)
+    if body is None:
+        response = getattr(client, method)(path)
+    else:
+        response = getattr(client, method)(path, body(context), content_type='application/json')
+    assert response.status_code < 300, (name, path, response.status_code)
+    if saves:
+        context[saves] = response.json()['id']
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])  # the test client's host
+def run_endpoint_suite(rounds=20, endpoints=ENDPOINTS):
+    """Latency, query count and peak Python memory of each endpoint through
+    the real URLconf, against whatever data the database holds. Writes:
+    every round sells one unit and creates a report.
+
+    One round warms up, one counts queries and traces memory, and
+    ``rounds`` more are timed without either getting in the way."""
+    user, _ = User.objects.get_or_create(
+        username='bench-admin', defaults={'is_admin': True, 'is_staff': True},
+    )
+    token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+    product = Product.objects.order_by('-quantity').first()
+    product.change_stock(rounds + 2)  # enough for every sale_create
+    context = {'product': product}
+    results = {endpoint[0]: {'path': endpoint[2]} for endpoint in endpoints}
+
+    for endpoint in endpoints:
+        call(client, endpoint, context)
+
+    tracemalloc.start()
+    try:
+        for endpoint in endpoints:
+            with CaptureQueriesContext(connection) as queries:
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                call(client, endpoint, context)
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+            results[endpoint[0]].update(queries=len(queries), peak_memory_kb=round(peak / 1024, 1))
+    finally:
+        tracemalloc.stop()
+
+    latencies = {name: [] for name in results}
+    for _ in range(rounds):
+        for endpoint in endpoints:
+            started = time.perf_counter()
+            call(client, endpoint, context)
+            latencies[endpoint[0]].append(time.perf_counter() - started)
+    for name, samples in latencies.items():
+        if samples:
+            results[name].update(summarize(samples, sum(samples)))
+    return results
+
+
+def run_load_benchmark(sizes=LOAD_SIZES, rounds=20, seed=0):
+    """Run the endpoint suite at each size, in a throwaway database (the
+    test database of the configured backend) seeded with that many sales,
+    and a private cache. Point DATABASE_URL at SQLite to measure SQLite."""
+    runs = []
+    for sales in sizes:
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'bench-{sales}',
+        }}):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            config.settings_cache.invalidate()
+            try:
+                started = time.perf_counter()
+                rows = seed_bench(products=max(round(sales * PRODUCTS_PER_SALE), 10), sales=sales, seed=seed)
+                seeded = time.perf_counter() - started
+                runs.append({
+                    'rows': rows,
+                    'seed_seconds': round(seeded, 1),
+                    'endpoints': run_endpoint_suite(rounds=rounds),
+                })
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                config.settings_cache.invalidate()
+    return {'database': connection.vendor, 'rounds': rounds, 'runs': runs}
+
+
+# ---------------------
+# Metrics Overhead
+# ---------------------
+@contextmanager
+def query_hook(enabled):
+    """Run with the metrics query wrapper on this thread's connection, or without it."""
+    connection.ensure_connection()
+    wrappers, original = connection.execute_wrappers, list(connection.execute_wrappers)
+    wrappers[:] = [wrapper for wrapper in original if wrapper is not metrics.count_query]
+    if enabled:
+        wrappers.append(metrics.count_query)
+    try:
+        yield
+    finally:
+        wrappers[:] = original
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])  # the test client's host
+def run_metrics_overhead_benchmark(requests=1000, paths=METRICS_PATHS, block=50):
+    """Latency of each read path with the metrics middleware and query hook
+    against a baseline without either, ``requests`` of each. The two
+    alternate in blocks of ``block`` requests so drift in the machine hits
+    both alike."""
+    with throwaway_user() as user:
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        without = [name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE]
+        clients = {}
+        # A test client builds its middleware chain on its first request
+        for variant, middleware in (('baseline', without), ('metrics', [without[0], METRICS_MIDDLEWARE, *without[1:]])):
+            with override_settings(MIDDLEWARE=middleware), query_hook(variant == 'metrics'):
+                clients[variant] = Client(headers=headers)
+                clients[variant].get(paths[0])
+        results = []
+        for path in paths:
+            latencies = {variant: [] for variant in clients}
+            for _ in range(max(requests // block, 1)):
+                for variant, client in clients.items():
+                    with query_hook(variant == 'metrics'):
+                        for _ in range(block):
+                            started = time.perf_counter()
+                            response = client.get(path)
+                            latencies[variant].append(time.perf_counter() - started)
+                            assert response.status_code == 200, (path, response.status_code)
+            baseline, measured = (statistics.fmean(latencies[variant]) for variant in ('baseline', 'metrics'))
+            results.append({
+                'path': path,
+                **{variant: summarize(samples, sum(samples)) for variant, samples in latencies.items()},
+                'overhead_ms': round((measured - baseline) * 1000, 3),
+                'overhead_percent': round((measured - baseline) / baseline * 100, 1),
+            })
+        return {'block': block, 'results': results}
@@ -0,0 +1,78 @@
+import hashlib
+from functools import wraps
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .models import TableVersion
+
+
+# ---------------------
+# Conditional GET
+# ---------------------
+def validators_for(request, models_):
+    """ETag and Last-Modified for ``request`` from the table versions alone.
+
+    The ETag covers the full URL and the user, so filtered views, pages and
+    permission-dependent output never share a tag."""
+    versions = TableVersion.current(*models_)
+    request.table_versions = (frozenset(TableVersion.names(models_)), versions)  # for cached_response
+    fingerprint = '|'.join(
+        [request.get_full_path(), str(request.user.pk)]
+        + [f'{name}:{versions.get(name, (0, None))[0]}' for name in TableVersion.names(models_)]
+    )
+    etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+    moments = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = int(max(moments).timestamp()) if moments else None
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag in tags or etag.strip('"') in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+
+def conditional_response(request, models_, render):
+    """Answer a GET with 304 if the client's copy is current, else call
+    ``render()`` and stamp the validators on the response."""
+    if request.method not in ('GET', 'HEAD'):
+        return render()
+
+    etag, last_modified = validators_for(request, models_)
+    if not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = render()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'  # always revalidate
+    return response
+
+
+def conditional_on(*models_):
+    """Decorator for function views, applied inside ``@api_view``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return conditional_response(request, models_, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified on ``list`` and ``retrieve`` for viewsets that name
+    the tables their output depends on in ``etag_models``."""
+    etag_models = ()
+
+    def list(self, request, *args, **kwargs):
+        render = super().list
+        return conditional_response(request, self.etag_models, lambda: render(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        render = super().retrieve
+        return conditional_response(request, self.etag_models, lambda: render(request, *args, **kwargs))
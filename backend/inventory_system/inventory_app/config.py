@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from .models import Setting, TableVersion
+
+CHECK_INTERVAL = 5  # seconds between version checks against the database
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+
+# ---------------------
+# Parsers
+# ---------------------
+def parse_bool(value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+def parse_decimal(value):
+    try:
+        return Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError(f"Not a decimal: {value!r}")
+
+
+PARSERS = {
+    str: str,
+    int: lambda value: int(value.strip()),
+    Decimal: parse_decimal,
+    bool: parse_bool,
+    'json': json.loads,
+}
+
+
+# ---------------------
+# Process Cache
+# ---------------------
+class SettingsCache:
+    """The whole Setting table, loaded once per process and reloaded only
+    when the table's version row has moved on. The version is checked at
+    most every ``CHECK_INTERVAL`` seconds, so most reads cost no query."""
+
+    def __init__(self):
+        self.values = {}
+        self.parsed = {}
+        self.version = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def stored_version(self):
+        return TableVersion.current(Setting).get(Setting._meta.model_name, (0, None))[0]
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < CHECK_INTERVAL:
+            return
+        with self.lock:
+            if self.version is not None and now - self.checked_at < CHECK_INTERVAL:
+                return
+            version = self.stored_version()
+            if version != self.version:
+                self.values = dict(Setting.objects.values_list('key', 'value'))
+                self.parsed = {}
+                self.version = version
+            self.checked_at = now
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+
+    def get(self, key, default=None, cast=str):
+        self.refresh()
+        memo = (key, cast)
+        if memo in self.parsed:
+            return self.parsed[memo]
+        raw = self.values.get(key)
+        if raw is None:
+            return default
+        try:
+            value = PARSERS[cast](raw)
+        except ValueError:
+            return default
+        self.parsed[memo] = value
+        return value
+
+
+settings_cache = SettingsCache()
+
+
+class SharedVersion:
+    """A named TableVersion counter as this process last saw it. Bumps go
+    through the database, so every worker notices them; reads hit it at
+    most every ``CHECK_INTERVAL`` seconds unless ``fresh``."""
+
+    def __init__(self, name):
+        self.name = name
+        self.value = None
+        self.checked_at = 0
+
+    def get(self, fresh=False):
+        now = time.monotonic()
+        if fresh or self.value is None or now - self.checked_at >= CHECK_INTERVAL:
+            self.value, self.checked_at = TableVersion.counter(self.name), now
+        return self.value
+
+    def bump(self):
+        self.value, self.checked_at = TableVersion.bump_counter(self.name), time.monotonic()
+        return self.value
+
+
+def get(key, default=None, cast=str):
+    """Setting ``key`` parsed with ``cast`` (str, int, Decimal, bool or
+    'json'); ``default`` if it is missing or doesn't parse."""
+    return settings_cache.get(key, default, cast)
+
+
+def get_int(key, default=None):
+    return get(key, default, int)
+
+
+def get_decimal(key, default=None):
+    return get(key, default, Decimal)
+
+
+def get_bool(key, default=None):
+    return get(key, default, bool)
+
+
+def get_json(key, default=None):
+    return get(key, default, 'json')
+
+
+def setting_changed(sender, **kwargs):
+    # Other workers notice the bumped version at their next check
+    settings_cache.invalidate()
+    transaction.on_commit(settings_cache.invalidate)
@@ -0,0 +1,65 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_date_bound(value, param, end=False):
+    """Turn a ``?from=`` / ``?to=`` value into an aware datetime.
+
+    Dates are whole local days, so ``to=2025-09-05`` includes that day."""
+    if not value:
+        return None
+    try:
+        # Dates first: parse_datetime() also accepts a bare date as midnight
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        moment = day = None
+    if day:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if not moment:
+        raise ValidationError({param: 'Expected a date (YYYY-MM-DD) or an ISO 8601 datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def parse_query_date(value, param):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({param: 'Expected a date (YYYY-MM-DD).'})
+    return day
+
+# ---------------------
+# Date Range + Lookup Filter
+# ---------------------
+class RecordFilter(BaseFilterBackend):
+    """``?from=&to=`` on the view's ``date_field`` plus the simple equality
+    filters listed in its ``filter_lookups`` (e.g. ``?product=`` / ``?category=``)."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        date_field = getattr(view, 'date_field', None)
+        if date_field:
+            start = parse_date_bound(params.get('from'), 'from')
+            end = parse_date_bound(params.get('to'), 'to', end=True)
+            if start:
+                queryset = queryset.filter(**{f'{date_field}__gte': start})
+            if end:
+                queryset = queryset.filter(**{f'{date_field}__lt': end})
+
+        for param, lookup in getattr(view, 'filter_lookups', {}).items():
+            value = params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (ValueError, TypeError):
+                raise ValidationError({param: f"Invalid value '{value}'."})
+
+        return queryset
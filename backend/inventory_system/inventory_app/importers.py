@@ -0,0 +1,242 @@
+import csv
+import json
+from collections import Counter
+from itertools import islice
+from django.db import transaction
+from django.db.models import Case, When, F
+from rest_framework import serializers
+from . import barcodes, search
+from .models import (
+    Product, Purchase, Totals, DailySummary, TableVersion, StockAlert, StockMovement, CostLayer, records_created,
+)
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+# ---------------------
+# Row Parsing
+# ---------------------
+def iter_rows(lines, fmt='csv'):
+    """Yield ``(row_number, dict_or_None)`` from an iterable of text lines.
+
+    Nothing is buffered beyond the current line. Unparseable NDJSON lines
+    come through as ``None`` so the caller can report them."""
+    if fmt == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Header is line 1, so the first data row is line 2
+            yield reader.line_num, {k.strip(): v for k, v in row.items() if k}
+
+
+def guess_format(name, content_type=''):
+    name = (name or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+# ---------------------
+# Row Serializers
+# ---------------------
+class ProductImportSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, min_value=0, default=0)  # opening stock
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'description', 'category', 'buying_price', 'selling_price', 'quantity']
+
+
+class PurchaseImportSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    price_per_unit = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+# ---------------------
+# Importer
+# ---------------------
+class InventoryImporter:
+    """Stream rows into the database in batches.
+
+    Each batch is validated row by row, then written with a few bulk
+    statements in one transaction. Bad rows are reported, not fatal, and
+    memory stays bounded by the batch size whatever the file size."""
+    serializers = {'products': ProductImportSerializer, 'purchases': PurchaseImportSerializer}
+
+    def __init__(self, kind, user=None, batch_size=IMPORT_BATCH_SIZE):
+        if kind not in self.serializers:
+            raise ValueError(f"Unknown import kind '{kind}'.")
+        self.kind = kind
+        self.user = user
+        self.batch_size = batch_size
+        self.counts = Counter()
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            valid = self.validate_batch(batch)
+            if valid:
+                with transaction.atomic():
+                    getattr(self, f'write_{self.kind}')(valid)
+        return self.report()
+
+    def report(self):
+        return {
+            'kind': self.kind,
+            **{key: self.counts[key] for key in ('rows', 'created', 'updated', 'purchases')},
+            'error_count': self.counts['errors'],
+            'errors': self.errors,
+        }
+
+    def add_error(self, row_number, errors):
+        self.counts['errors'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def validate_batch(self, batch):
+        serializer_class = self.serializers[self.kind]
+        valid = []
+        for row_number, row in batch:
+            self.counts['rows'] += 1
+            if row is None:
+                self.add_error(row_number, {'non_field_errors': ['Row is not a JSON object.']})
+                continue
+            data = {key: value for key, value in row.items() if value not in (None, '')}
+            serializer = serializer_class(data=data)
+            if serializer.is_valid():
+                valid.append((row_number, serializer.validated_data))
+            else:
+                self.add_error(row_number, serializer.errors)
+        return valid
+
+    def write_products(self, rows):
+        existing = Product.objects.in_bulk([data['id'] for _, data in rows if 'id' in data])
+        created, purchases = [], []
+        updated = {}
+        stock = Counter()
+        deltas = Counter()
+
+        for row_number, data in rows:
+            data = dict(data)
+            opening = data.pop('quantity', 0)
+            product_id = data.pop('id', None)
+            if product_id is None:
+                product = Product(quantity=opening, **data)
+                created.append(product)
+                deltas['low_stock_count'] += int(product.is_low_stock)
+                deltas['product_count'] += 1
+            elif product_id in existing:
+                product = existing[product_id]
+                old_quantity = product.quantity + stock[product_id]
+                for field, value in data.items():
+                    setattr(product, field, value)
+                stock[product_id] += opening
+                updated[product_id] = product
+                deltas.update(Totals.product_change_deltas(
+                    old_quantity, old_quantity + opening, product.reorder_level, product.reorder_level,
+                ))
+            else:
+                self.add_error(row_number, {'id': [f"Product {product_id} does not exist."]})
+                continue
+            if opening:
+                purchases.append(Purchase(
+                    product=product, quantity=opening, price_per_unit=product.buying_price,
+                    amount=product.buying_price * opening, purchased_by=self.user,
+                ))
+
+        Product.objects.bulk_create(created)
+        if updated:
+            fields = ['name', 'description', 'category', 'buying_price', 'selling_price']
+            Product.objects.bulk_update(list(updated.values()), fields)
+        if created or updated:
+            search.touch()  # bulk writes skip the signals; rebuild the prefix index lazily
+            barcodes.touch()
+        self.add_stock(stock)
+        StockAlert.record(
+            (product_id, updated[product_id].quantity, updated[product_id].reorder_level,
+             updated[product_id].quantity + n, updated[product_id].reorder_level)
+            for product_id, n in stock.items()
+        )
+        Purchase.objects.bulk_create(purchases)
+        StockMovement.record((p.product_id, StockMovement.PURCHASE, p.quantity, p.pk) for p in purchases)
+        deltas['inventory_value'] += CostLayer.receive((p.product_id, p.quantity, p.price_per_unit, p.pk) for p in purchases)
+        records_created.send(sender=Purchase, records=purchases)
+
+        deltas['total_purchases'] += sum(p.amount for p in purchases)
+        Totals.bump(**deltas)
+        DailySummary.record_many((p.purchased_at, p.product_id, p.summary_values()) for p in purchases)
+        TableVersion.bump(Product, Purchase)
+        self.counts.update(created=len(created), updated=len(updated), purchases=len(purchases))
+
+    def write_purchases(self, rows):
+        products = Product.objects.in_bulk([data['product'] for _, data in rows])
+        purchases = []
+        stock = Counter()
+        prices = {}
+
+        for row_number, data in rows:
+            product = products.get(data['product'])
+            if product is None:
+                self.add_error(row_number, {'product': [f"Product {data['product']} does not exist."]})
+                continue
+            purchases.append(Purchase(
+                product=product, quantity=data['quantity'], price_per_unit=data['price_per_unit'],
+                amount=data['price_per_unit'] * data['quantity'], purchased_by=self.user,
+            ))
+            stock[product.pk] += data['quantity']
+            prices[product.pk] = data['price_per_unit']  # latest purchase sets the buying price
+
+        deltas = Counter()
+        for product_id, quantity in stock.items():
+            product = products[product_id]
+            deltas.update(Totals.product_change_deltas(
+                product.quantity, product.quantity + quantity, product.reorder_level, product.reorder_level,
+            ))
+
+        self.add_stock(stock, prices)
+        StockAlert.record(
+            (product_id, products[product_id].quantity, products[product_id].reorder_level,
+             products[product_id].quantity + n, products[product_id].reorder_level)
+            for product_id, n in stock.items()
+        )
+        Purchase.objects.bulk_create(purchases)
+        StockMovement.record((p.product_id, StockMovement.PURCHASE, p.quantity, p.pk) for p in purchases)
+        deltas['inventory_value'] += CostLayer.receive((p.product_id, p.quantity, p.price_per_unit, p.pk) for p in purchases)
+        records_created.send(sender=Purchase, records=purchases)
+
+        deltas['total_purchases'] += sum(p.amount for p in purchases)
+        Totals.bump(**deltas)
+        DailySummary.record_many((p.purchased_at, p.product_id, p.summary_values()) for p in purchases)
+        TableVersion.bump(Product, Purchase)
+        self.counts.update(purchases=len(purchases))
+
+    @staticmethod
+    def add_stock(stock, prices=None):
+        stock = {product_id: n for product_id, n in stock.items() if n}
+        if not stock:
+            return
+        updates = {'quantity': Case(
+            *[When(pk=product_id, then=F('quantity') + n) for product_id, n in stock.items()],
+            default=F('quantity'),
+        )}
+        if prices:
+            updates['buying_price'] = Case(
+                *[When(pk=product_id, then=price) for product_id, price in prices.items()],
+                default=F('buying_price'),
+            )
+        Product.objects.filter(pk__in=list(stock)).update(**updates)
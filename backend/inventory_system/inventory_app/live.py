@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Purchase, Sale, Expense, Totals
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LIMIT = 5  # entries per event, newest first; the dashboard shows five
+QUEUE_SIZE = 100  # events a slow dashboard may fall behind before it is dropped
+
+
+# ---------------------
+# Dashboard Payloads
+# ---------------------
+def dashboard_stats(totals):
+    return {
+        'total_products': totals.product_count,
+        'total_users': totals.user_count,
+        'total_sales': totals.total_sales,
+        'total_purchases': totals.total_purchases,
+        'total_expenses': totals.total_expenses,
+        'net_profit': totals.net_profit,  # ✅ Net Profit = Sales - COGS - Expenses
+        'total_product_price': totals.inventory_value,
+        'low_stock_products': totals.low_stock_count
+    }
+
+
+def activity_entry(record):
+    if isinstance(record, Sale):
+        return f"🛒 Sold {record.quantity} × {record.product.name} for {record.amount} TZS"
+    if isinstance(record, Purchase):
+        return f"📦 Purchased {record.quantity} × {record.product.name} for {record.amount} TZS"
+    return f"💸 Spent {record.amount} TZS on {record.description}"
+
+
+def encode(event_type, data):
+    """One Server-Sent Events frame."""
+    return f"event: {event_type}\ndata: {json.dumps(data, cls=JSONEncoder, separators=(',', ':'))}\n\n".encode()
+
+
+# ---------------------
+# Brokers
+# ---------------------
+class LocalBroker:
+    """Delivers events to the subscribers in this process.
+
+    Enough for a single worker, and the stand-in for a shared broker in
+    tests: several hubs subscribed to one LocalBroker behave like several
+    workers behind one. A broker only needs ``publish`` and ``subscribe``."""
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            callback(event)
+
+
+class PostgresBroker(LocalBroker):
+    """Delivers events to every worker through Postgres LISTEN/NOTIFY.
+
+    Each worker listens on one extra connection from a daemon thread; the
+    publishing worker hears its own notifications like everyone else."""
+    channel = 'dashboard_feed'
+    poll_interval = 5
+    retry_delay = 1  # seconds before listening again after the connection drops
+    max_retry_delay = 60
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+
+    def subscribe(self, callback):
+        super().subscribe(callback)
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name='dashboard-feed', daemon=True)
+                self.listener.start()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(event, cls=JSONEncoder)])
+
+    def connect(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        conn = psycopg2.connect(**connection.get_connection_params())
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.channel}')
+        return conn
+
+    def listen(self):
+        """Relay notifications for the life of the worker. A lost connection
+        is logged, closed and opened again after a pause that doubles up to
+        ``max_retry_delay``; events sent while it is down are lost."""
+        import psycopg2
+
+        delay = self.retry_delay
+        while True:
+            conn = None
+            try:
+                conn = self.connect()
+                delay = self.retry_delay
+                self.relay(conn)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, OSError):
+                logger.warning("Dashboard feed lost its connection; listening again in %ss", delay, exc_info=True)
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def relay(self, conn):
+        while True:
+            if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                super().publish(json.loads(conn.notifies.pop(0).payload))
+
+
+_broker = None
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'DASHBOARD_FEED_BROKER', 'inventory_app.live.LocalBroker'))()
+    return _broker
+
+
+# ---------------------
+# Fan-out
+# ---------------------
+class Hub:
+    """The open dashboard streams in this worker. Each event from the broker
+    is encoded once and handed to every stream's queue on its event loop."""
+
+    def __init__(self):
+        self.streams = {}  # queue -> loop
+        self.lock = threading.Lock()
+        self.subscribed_to = None
+
+    def connect(self, source=None):
+        source = source or broker()
+        with self.lock:
+            if self.subscribed_to is None:
+                source.subscribe(self.deliver)
+                self.subscribed_to = source
+
+    def open(self, loop=None):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self.lock:
+            self.streams[queue] = loop or asyncio.get_running_loop()
+        return queue
+
+    def close(self, queue):
+        with self.lock:
+            self.streams.pop(queue, None)
+
+    def deliver(self, event):
+        frame = encode('update', event)
+        with self.lock:
+            streams = list(self.streams.items())
+        for queue, loop in streams:
+            try:
+                loop.call_soon_threadsafe(self.offer, queue, frame)
+            except RuntimeError:  # loop already closed
+                self.close(queue)
+
+    def offer(self, queue, frame):
+        try:
+            queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream and let EventSource reconnect
+            self.close(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+hub = Hub()
+
+
+# ---------------------
+# Publishing
+# ---------------------
+def publish_after_commit(records=()):
+    """Send one event for this write once it commits: the stats after it
+    and the activity entries for ``records``."""
+    records = sorted(records, key=lambda record: record.pk or 0, reverse=True)[:ACTIVITY_LIMIT]
+
+    def publish():
+        totals = Totals.objects.filter(pk=Totals.SINGLETON_ID).first() or Totals.rebuild()
+        broker().publish({
+            'stats': dashboard_stats(totals),
+            'recent': [activity_entry(record) for record in records],
+        })
+
+    # The write has committed either way; a failed publish only costs dashboards one update
+    transaction.on_commit(publish, robust=True)
+
+
+def record_saved(sender, instance, created=False, **kwargs):
+    publish_after_commit([instance] if created else [])
+
+
+def record_deleted(sender, instance, **kwargs):
+    publish_after_commit()
+
+
+def records_created(sender, records, **kwargs):
+    publish_after_commit(records)
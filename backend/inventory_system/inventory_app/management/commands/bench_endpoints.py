@@ -0,0 +1,22 @@
+import json
+from django.core.management.base import BaseCommand
+from inventory_app.benchmarks import LOAD_SIZES, run_load_benchmark
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway database at each size and report latency, query count and peak memory "
+            "per endpoint as JSON. Run with DATABASE_URL=sqlite:///bench.sqlite3 to measure SQLite.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(LOAD_SIZES), help="Sales per run.")
+        parser.add_argument('--rounds', type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Also write the JSON to this file.")
+
+    def handle(self, *args, **options):
+        result = run_load_benchmark(sizes=options['sizes'], rounds=options['rounds'], seed=options['seed'])
+        report = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+        self.stdout.write(report)
@@ -0,0 +1,15 @@
+import json
+from django.core.management.base import BaseCommand
+from inventory_app.benchmarks import run_metrics_overhead_benchmark
+
+
+class Command(BaseCommand):
+    help = "Compare read-endpoint latency with the request metrics middleware against a baseline without it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per endpoint and variant.")
+        parser.add_argument('--block', type=int, default=50, help="Requests in a row before switching variant.")
+
+    def handle(self, *args, **options):
+        result = run_metrics_overhead_benchmark(requests=options['requests'], block=options['block'])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,15 @@
+import json
+from django.core.management.base import BaseCommand
+from inventory_app.benchmarks import run_read_path_benchmark
+
+
+class Command(BaseCommand):
+    help = "Compare p50/p99 latency of the sync (WSGI) and async (ASGI) read endpoints at the same concurrency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and path.")
+
+    def handle(self, *args, **options):
+        result = run_read_path_benchmark(concurrency=options['concurrency'], requests=options['requests'])
+        self.stdout.write(json.dumps(result, indent=2))
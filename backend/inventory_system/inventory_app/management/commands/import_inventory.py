@@ -0,0 +1,29 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from inventory_app.importers import InventoryImporter, iter_rows, guess_format, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Stream products or opening-stock purchases from a CSV or NDJSON file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=['products', 'purchases'], default='products')
+        parser.add_argument('--type', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['type'] or guess_format(options['path'])
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as lines:
+                importer = InventoryImporter(options['kind'], batch_size=options['batch_size'])
+                report = importer.run(iter_rows(lines, fmt))
+        except OSError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(json.dumps(report, indent=2, default=str))
+        style = self.style.WARNING if report['error_count'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{report['rows']} rows: {report['created']} created, {report['updated']} updated, "
+            f"{report['purchases']} purchases, {report['error_count']} errors."
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory_app.models import DailySummary
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day sales/purchase/expense rollups from the history tables."
+
+    def handle(self, *args, **options):
+        count = DailySummary.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Daily summaries rebuilt: {count} rows."))
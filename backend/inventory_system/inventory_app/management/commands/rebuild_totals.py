@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventory_app.models import Totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the running dashboard totals from the sales, purchases, expenses and products tables."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            totals = Totals.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Totals rebuilt: sales={totals.total_sales} purchases={totals.total_purchases} "
+            f"expenses={totals.total_expenses} cogs={totals.cogs} "
+            f"inventory={totals.inventory_value} low_stock={totals.low_stock_count}"
+        ))
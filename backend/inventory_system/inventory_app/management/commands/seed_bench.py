@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory_app.seeding import seed_bench
+
+
+class Command(BaseCommand):
+    help = "Add synthetic products, purchases, sales and expenses for benchmarking. Never run it against real data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--sales', type=int, default=100000)
+        parser.add_argument('--expenses', type=int, default=None, help="Defaults to one per 50 sales.")
+        parser.add_argument('--days', type=int, default=365, help="Spread the history over this many days.")
+        parser.add_argument('--seed', type=int, default=0, help="The same seed gives the same data.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['products'] < 1:
+            raise CommandError("--days and --products must be at least 1.")
+        counts = seed_bench(
+            products=options['products'], sales=options['sales'], expenses=options['expenses'],
+            days=options['days'], seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {products} products, {purchases} purchases, {sales} sales, {expenses} expenses.".format(**counts)
+        ))
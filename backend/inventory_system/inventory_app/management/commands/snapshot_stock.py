@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory_app.models import StockSnapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot the stock of every product that moved since its last snapshot. Run periodically (e.g. nightly) to keep point-in-time stock queries cheap."
+
+    def handle(self, *args, **options):
+        snapshots = StockSnapshot.take()
+        self.stdout.write(self.style.SUCCESS(f"Snapshots taken: {len(snapshots)}"))
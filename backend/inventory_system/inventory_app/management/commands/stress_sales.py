@@ -0,0 +1,22 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from inventory_app.stress import run_sale_stress
+
+
+class Command(BaseCommand):
+    help = "Sell one product concurrently from many threads and check for oversells and lost updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=100, help="Sale attempts per thread.")
+        parser.add_argument('--stock', type=int, default=500)
+
+    def handle(self, *args, **options):
+        result = run_sale_stress(
+            threads=options['threads'], attempts=options['attempts'], stock=options['stock'],
+        )
+        self.stdout.write(json.dumps(result, indent=2))
+
+        if result['oversold'] or result['lost_updates']:
+            raise CommandError("Stock went out of step with the recorded sales.")
+        self.stdout.write(self.style.SUCCESS(f"{result['sales_per_second']} sales/second, no oversells."))
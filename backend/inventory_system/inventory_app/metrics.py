@@ -0,0 +1,185 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Upper bounds in seconds; a request slower than the last lands in +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'invento_http'
+UNMATCHED = 'unmatched'  # no URL pattern; keeps 404 scans from adding a series per path
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}  # anything else counts as OTHER
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Slots of a route's row: totals, then one count per latency bucket
+REQUESTS, SECONDS, QUERIES, QUERY_SECONDS, BYTES, BUCKETS = range(6)
+
+_current = ContextVar('metrics_sample', default=None)
+
+
+# ---------------------
+# Counters
+# ---------------------
+class Registry:
+    """Per-route counters for this process: one flat list per (route,
+    method) and a count per status, updated under one short lock."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.statuses = Counter()
+
+    def observe(self, route, method, status, seconds, queries, query_seconds, size):
+        bucket = BUCKETS + bisect_left(self.buckets, seconds)
+        with self.lock:
+            row = self.routes.get((route, method))
+            if row is None:
+                row = self.routes[(route, method)] = [0] * (BUCKETS + len(self.buckets) + 1)
+            row[REQUESTS] += 1
+            row[SECONDS] += seconds
+            row[QUERIES] += queries
+            row[QUERY_SECONDS] += query_seconds
+            row[BYTES] += size
+            row[bucket] += 1
+            self.statuses[(route, method, status)] += 1
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+            self.statuses.clear()
+
+    def render(self):
+        """The counters in the Prometheus text exposition format."""
+        with self.lock:
+            routes = {key: list(row) for key, row in self.routes.items()}
+            statuses = dict(self.statuses)
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+        family('requests_total', 'counter', 'Requests served, by route, method and status.')
+        for (route, method, status), count in sorted(statuses.items()):
+            lines.append(f'{PREFIX}_requests_total{labels(route, method, status=status)} {count}')
+
+        family('request_duration_seconds', 'histogram', 'Time spent in the Django stack per request.')
+        for (route, method), row in sorted(routes.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), row[BUCKETS:]):
+                cumulative += count
+                lines.append(f'{PREFIX}_request_duration_seconds_bucket{labels(route, method, le=bound)} {cumulative}')
+            lines.append(f'{PREFIX}_request_duration_seconds_sum{labels(route, method)} {row[SECONDS]:.6f}')
+            lines.append(f'{PREFIX}_request_duration_seconds_count{labels(route, method)} {row[REQUESTS]}')
+
+        for name, slot, help_text, value_format in (
+            ('db_queries_total', QUERIES, 'Database queries run by requests.', 'd'),
+            ('db_query_duration_seconds_total', QUERY_SECONDS, 'Time requests spent waiting on the database.', '.6f'),
+            ('response_bytes_total', BYTES, 'Response body bytes, streaming responses excepted.', 'd'),
+        ):
+            family(name, 'counter', help_text)
+            for (route, method), row in sorted(routes.items()):
+                lines.append(f'{PREFIX}_{name}{labels(route, method)} {row[slot]:{value_format}}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(route, method, **extra):
+    pairs = [('route', route), ('method', method), *extra.items()]
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs) + '}'
+
+
+# ---------------------
+# Query Counting
+# ---------------------
+class Sample:
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def count_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:  # outside a request: management commands, threads of their own
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.query_seconds += time.perf_counter() - started
+
+
+def connection_created(sender, connection, **kwargs):
+    """Hook every database connection once. The sample travels in a context
+    variable, so queries an async view runs in a worker thread still count
+    towards its request."""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+# ---------------------
+# Middleware
+# ---------------------
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Time each request through the rest of the stack and count its
+    queries and response bytes, by route (the URL pattern's name, never
+    the raw path). Works on both the WSGI and the ASGI handler."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample, started = Sample(), time.perf_counter()
+        token = _current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, sample, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        sample, started = Sample(), time.perf_counter()
+        token = _current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, sample, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, sample, seconds):
+        size = response.get('Content-Length')  # set by CommonMiddleware, further in
+        if size is None:
+            size = 0 if response.streaming else len(response.content)
+        method = request.method if request.method in METHODS else 'OTHER'
+        registry.observe(
+            route_of(request), method, response.status_code,
+            seconds, sample.queries, sample.query_seconds, int(size),
+        )
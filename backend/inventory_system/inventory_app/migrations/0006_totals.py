@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0005_product_selling_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Totals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_purchases', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cogs', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inventory_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('low_stock_count', models.IntegerField(default=0)),
+                ('product_count', models.IntegerField(default=0)),
+                ('user_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'totals',
+            },
+        ),
+    ]
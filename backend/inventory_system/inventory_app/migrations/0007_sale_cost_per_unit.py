@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:22
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_cost_per_unit(apps, schema_editor):
+    # Best available figure for historical sales is the product's current buying price.
+    Sale = apps.get_model('inventory_app', 'Sale')
+    Product = apps.get_model('inventory_app', 'Product')
+    Sale.objects.update(cost_per_unit=Subquery(
+        Product.objects.filter(pk=OuterRef('product_id')).values('buying_price')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0006_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='cost_per_unit',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_cost_per_unit, migrations.RunPython.noop),
+    ]
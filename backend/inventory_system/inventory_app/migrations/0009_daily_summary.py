@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0008_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('cogs', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('purchases_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units_purchased', models.IntegerField(default=0)),
+                ('expenses_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='inventory_app.product')),
+            ],
+            options={
+                'verbose_name_plural': 'daily summaries',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('date', 'product'), name='daily_summary_product_day'), models.UniqueConstraint(condition=models.Q(('product__isnull', True)), fields=('date',), name='daily_summary_shop_day')],
+            },
+        ),
+    ]
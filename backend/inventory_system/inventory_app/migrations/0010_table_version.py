@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_versions(apps, schema_editor):
+    # One row per versioned table so bumps are a single UPDATE from day one.
+    TableVersion = apps.get_model('inventory_app', 'TableVersion')
+    TableVersion.objects.bulk_create([
+        TableVersion(name=name, version=1)
+        for name in ('expense', 'product', 'purchase', 'report', 'sale', 'setting', 'user')
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0009_daily_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
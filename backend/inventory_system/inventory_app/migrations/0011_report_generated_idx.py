@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0010_table_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['generated_at', 'id'], name='report_generated_idx'),
+        ),
+    ]
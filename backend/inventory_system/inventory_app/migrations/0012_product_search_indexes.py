@@ -0,0 +1,38 @@
+from django.db import migrations
+
+SEARCH_INDEXES = {
+    'product_name_trgm_idx': 'name',
+    'product_category_trgm_idx': 'category',
+    'product_description_trgm_idx': 'description',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Postgres only; on SQLite search falls back to the in-process prefix index.
+    # The expressions match what icontains compiles to: UPPER(col::text) LIKE ...
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in SEARCH_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON inventory_app_product '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0011_report_generated_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:44
+
+import django.db.models.deletion
+import inventory_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0013_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('low', 'Low stock'), ('restocked', 'Restocked')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('reorder_level', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # Existing products keep the old fixed threshold; new ones take the setting
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.IntegerField(default=2),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='reorder_level',
+            field=models.IntegerField(default=inventory_app.models.default_reorder_level),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['id'], name='product_low_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_app.product'),
+        ),
+    ]
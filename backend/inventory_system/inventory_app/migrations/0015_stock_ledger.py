@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Existing stock becomes each product's opening adjustment, so the
+    # ledger adds up to Product.quantity from the start.
+    Product = apps.get_model('inventory_app', 'Product')
+    StockMovement = apps.get_model('inventory_app', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        (StockMovement(product_id=product_id, kind='adjustment', quantity=quantity)
+         for product_id, quantity in Product.objects.exclude(quantity=0).values_list('id', 'quantity').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0014_reorder_levels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('purchase', 'Purchase'), ('sale', 'Sale'), ('reversal', 'Reversal'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('reference', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_app.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at', 'id'], name='movement_product_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField()),
+                ('quantity', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_app.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='snapshot_product_time_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def open_cost_layers(apps, schema_editor):
+    # Past sales keep the cost they were recorded at; stock on hand opens
+    # one layer per product at its buying price, which is what the running
+    # inventory value was built from.
+    Sale = apps.get_model('inventory_app', 'Sale')
+    Product = apps.get_model('inventory_app', 'Product')
+    CostLayer = apps.get_model('inventory_app', 'CostLayer')
+    Sale.objects.update(cost_amount=F('quantity') * F('cost_per_unit'))
+    CostLayer.objects.bulk_create(
+        (CostLayer(product_id=product_id, quantity=quantity, remaining=quantity, unit_cost=price)
+         for product_id, quantity, price in Product.objects.filter(quantity__gt=0).values_list(
+             'id', 'quantity', 'buying_price').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0015_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='cost_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('remaining', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_app.product')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory_app.purchase')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('remaining__gt', 0)), fields=['product', 'id'], name='cost_layer_open_idx')],
+            },
+        ),
+        migrations.RunPython(open_cost_layers, migrations.RunPython.noop),
+    ]
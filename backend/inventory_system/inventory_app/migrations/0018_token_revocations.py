@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_revocations(apps, schema_editor):
+    User = apps.get_model('inventory_app', 'User')
+    TokenRevocation = apps.get_model('inventory_app', 'TokenRevocation')
+    TokenRevocation.objects.bulk_create(
+        TokenRevocation(user_id=user_id, revoked_at=revoked_at)
+        for user_id, revoked_at in User.objects.filter(tokens_revoked_at__isnull=False).values_list(
+            'id', 'tokens_revoked_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0017_user_tokens_revoked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('revoked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(copy_revocations, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='tokens_revoked_at',
+        ),
+    ]
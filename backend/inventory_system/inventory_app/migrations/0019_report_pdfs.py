@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0018_token_revocations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportPdf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('detailed', models.BooleanField(default=False)),
+                ('content_hash', models.CharField(max_length=16)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('pdf', models.BinaryField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdfs', to='inventory_app.report')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('report', 'detailed'), name='report_pdf_mode')],
+            },
+        ),
+    ]
@@ -1,7 +1,77 @@
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import models, transaction, IntegrityError
+from django.db.models import Sum, F, Count, Max, Q, Value, Subquery, OuterRef, Case, When
+from django.db.models.functions import Coalesce, TruncDate, Now
 from django.contrib.auth.models import AbstractUser
+from django.dispatch import Signal
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+LOW_STOCK_THRESHOLD = 2  # reorder level for new products unless the 'default_reorder_level' setting says otherwise
+
+def scalar_sum(queryset, expression):
+    """``COALESCE((SELECT SUM(expression) FROM queryset), 0)`` as an expression."""
+    subquery = queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(
+        total=Sum(expression)
+    ).values('total')[:1]
+    return Coalesce(
+        Subquery(subquery, output_field=models.DecimalField()),
+        Decimal('0'),
+        output_field=models.DecimalField(),
+    )
+
+# ---------------------
+# Loaded Values Tracking
+# ---------------------
+class TrackedFieldsMixin:
+    """Remember the values of ``tracked_fields`` as they were last read from
+    or written to the database, so ``save()`` can work out deltas."""
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        refreshed = {f: self.__dict__.get(f) for f in self.tracked_fields if fields is None or f in fields}
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **refreshed}
+
+    def remember_loaded_values(self):
+        self._loaded_values = {f: self.__dict__.get(f) for f in self.tracked_fields}
+
+    def loaded_value(self, field):
+        return getattr(self, '_loaded_values', {}).get(field)
+
+
+class StockMovementMixin(TrackedFieldsMixin):
+    """Shared by Sale and Purchase, whose ``quantity`` moves product stock."""
+    stock_sign = 1
+
+    def restore_previous_product_stock(self):
+        """Return the quantity this row already moved on ``self.product``.
+
+        If an edit switched the row to another product, the old product's
+        stock is put back first and 0 is returned."""
+        old_quantity = self.loaded_value('quantity') or 0
+        old_product_id = self.loaded_value('product_id')
+        if old_quantity and old_product_id != self.product_id:
+            Product.objects.get(pk=old_product_id).change_stock(
+                -self.stock_sign * old_quantity, clamp=True, kind=StockMovement.REVERSAL, reference=self.pk,
+                unit_cost=self.returned_unit_cost(),
+            )
+            return 0
+        return old_quantity
+
+    def returned_unit_cost(self):
+        """What each unit this row moved is worth if it goes back into stock;
+        None for the product's buying price."""
+        return None
+
 # ---------------------
 # Custom User Model
 # ---------------------
@@ -12,33 +82,172 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+
+class TokenRevocation(models.Model):
+    """When a user's access tokens stopped being trusted. Keyed by the bare
+    user id, not a foreign key, so it outlives a deleted user."""
+    user_id = models.BigIntegerField(primary_key=True)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"user {self.user_id} revoked {self.revoked_at}"
+
 # ---------------------
 # Product
 # ---------------------
-class Product(models.Model):
+SEARCH_FIELDS = ('name', 'category', 'description')
+
+
+def default_reorder_level():
+    from .config import get_int  # config imports this module
+    return get_int('default_reorder_level', LOW_STOCK_THRESHOLD)
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_stock_value(self):
+        """Annotate ``stock_value`` (read by ``total_value``) in the same query."""
+        layers = CostLayer.objects.filter(product=OuterRef('pk'), remaining__gt=0)
+        return self.annotate(stock_value=scalar_sum(layers, F('remaining') * F('unit_cost')))
+
+    def low_stock(self):
+        """At or below their reorder level; served by ``product_low_stock_idx``."""
+        return self.filter(quantity__lte=F('reorder_level'))
+
+    def search(self, query):
+        """Products matching every word of ``query`` in name, category or
+        description, best first: name prefix, name, category, description.
+
+        On Postgres the icontains lookups use the trigram indexes from
+        migration 0012."""
+        queryset = self
+        for term in query.split():
+            match = Q()
+            for field in SEARCH_FIELDS:
+                match |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(match)
+        return queryset.annotate(rank=Case(
+            When(name__istartswith=query, then=Value(0)),
+            When(name__icontains=query, then=Value(1)),
+            When(category__icontains=query, then=Value(2)),
+            default=Value(3),
+        )).order_by('rank', 'name', 'id')
+
+
+class Product(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('quantity', 'reorder_level')
+
     name = models.CharField(max_length=100)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)  # SKU or barcode, scanned at the till
     description = models.TextField(blank=True)
     quantity = models.IntegerField(default=0)
     buying_price = models.DecimalField(max_digits=10, decimal_places=2)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     category = models.CharField(max_length=100, blank=True)
+    reorder_level = models.IntegerField(default=default_reorder_level)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'id'], name='product_category_idx'),
+            models.Index(fields=['id'], condition=Q(quantity__lte=F('reorder_level')), name='product_low_stock_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
     @property
     def total_value(self):
-        return self.buying_price * self.quantity
+        """Cost of the stock on hand, from the open cost layers; annotated by
+        ``ProductQuerySet.with_stock_value`` for lists."""
+        value = self.__dict__.get('stock_value')
+        if value is None:
+            return CostLayer.objects.filter(product=self).open_value()
+        return Decimal(value).quantize(CENT)
 
     @property
     def is_low_stock(self):
-        return self.quantity <= 2
+        return self.quantity <= self.reorder_level
+
+    def save(self, *args, **kwargs):
+        """Save the product. An edit never writes ``quantity`` back: the
+        stored value may have moved since this instance was loaded, so a
+        changed quantity goes through ``change_stock`` as the difference."""
+        self.sku = (self.sku or '').strip() or None  # blank codes must not collide on the unique index
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                value = CostLayer.adjust(self.pk, self.quantity, self.buying_price)  # opening stock
+                Totals.apply_product(self, inventory_value=value)
+                StockMovement.record([(self.pk, StockMovement.ADJUSTMENT, self.quantity, None)])
+            self.remember_loaded_values()
+            return
+
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+        with transaction.atomic():
+            stored_quantity, stored_level = Product.objects.select_for_update().values_list(
+                'quantity', 'reorder_level').get(pk=self.pk)
+            loaded_quantity = self.loaded_value('quantity')
+            delta = self.quantity - (stored_quantity if loaded_quantity is None else loaded_quantity)
+            self.quantity = stored_quantity
+            super().save(*args, update_fields=[f for f in update_fields if f != 'quantity'], **kwargs)
+            if self.reorder_level != stored_level:
+                Totals.apply_product_change(stored_quantity, stored_quantity, stored_level, self.reorder_level, 0)
+                StockAlert.record([(self.pk, stored_quantity, stored_level, stored_quantity, self.reorder_level)])
+            if delta and 'quantity' in update_fields:
+                self.change_stock(delta)
+
+        self.remember_loaded_values()
+
+    def change_stock(self, delta, clamp=False, buying_price=None, kind='adjustment', reference=None, unit_cost=None):
+        """Atomically add ``delta`` to the stored quantity, writing only the
+        stock columns, and refresh this instance from the result.
+
+        The conditional UPDATE takes the row lock before anything is read, so
+        concurrent tills can't lose updates or oversell. A decrement that
+        would go below zero raises ValidationError, or stops at zero with
+        ``clamp``. ``buying_price`` is written in the same transaction.
+
+        The change goes into the stock ledger as ``kind`` / ``reference``,
+        and into the cost layers: units added cost ``unit_cost`` (default the
+        buying price), units removed are used up oldest first. Pass
+        ``kind=None`` if the caller does both itself."""
+        rows = Product.objects.filter(pk=self.pk)
+        with transaction.atomic():
+            if delta < 0 and not rows.filter(quantity__gte=-delta).update(quantity=F('quantity') + delta):
+                if not clamp:
+                    raise ValidationError("Insufficient stock for sale.")
+                delta = -rows.select_for_update().values_list('quantity', flat=True).get()
+                rows.update(quantity=0)
+            elif delta > 0:
+                rows.update(quantity=F('quantity') + delta)
+
+            quantity, old_price, level = rows.values_list('quantity', 'buying_price', 'reorder_level').get()
+            price = old_price
+            if buying_price is not None and buying_price != old_price:
+                rows.update(buying_price=buying_price)
+                price = buying_price
+            value = 0
+            if kind:
+                value = CostLayer.adjust(self.pk, delta, price if unit_cost is None else unit_cost)
+                StockMovement.record([(self.pk, kind, delta, reference)])
+            Totals.apply_product_change(quantity - delta, quantity, level, level, value)
+            StockAlert.record([(self.pk, quantity - delta, level, quantity, level)])
+            TableVersion.bump(Product)
+
+        self.quantity, self.buying_price = quantity, price
+        self.remember_loaded_values()
+        return quantity
 
 # ---------------------
 # Purchase
 # ---------------------
-class Purchase(models.Model):
+class Purchase(StockMovementMixin, models.Model):
+    tracked_fields = ('amount', 'quantity', 'product_id')
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
@@ -46,16 +255,36 @@ class Purchase(models.Model):
     purchased_at = models.DateTimeField(auto_now_add=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['purchased_at', 'id'], name='purchase_time_idx'),
+            models.Index(fields=['product', 'purchased_at'], name='purchase_product_time_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.amount = self.price_per_unit * self.quantity
 
-        if self.product.buying_price != self.price_per_unit:
-            self.product.buying_price = self.price_per_unit
+        with transaction.atomic():
+            old_quantity = self.restore_previous_product_stock()
+            self.product.change_stock(self.quantity - old_quantity, buying_price=self.price_per_unit, kind=None)
+
+            old_amount = self.loaded_value('amount') or 0
+            super().save(*args, **kwargs)
+            value = CostLayer.adjust(self.product_id, self.quantity - old_quantity, self.price_per_unit, purchase_id=self.pk)
+            StockMovement.record([(self.product_id, StockMovement.PURCHASE, self.quantity - old_quantity, self.pk)])
+            Totals.bump(total_purchases=self.amount - old_amount, inventory_value=value)
+            DailySummary.record_many([
+                (self.purchased_at, self.loaded_value('product_id'), {
+                    'purchases_total': -old_amount,
+                    'units_purchased': -(self.loaded_value('quantity') or 0),
+                }),
+                (self.purchased_at, self.product_id, self.summary_values()),
+            ])
 
-        self.product.quantity += self.quantity
-        self.product.save()
+        self.remember_loaded_values()
 
-        super().save(*args, **kwargs)
+    def summary_values(self):
+        return {'purchases_total': self.amount, 'units_purchased': self.quantity}
 
     def __str__(self):
         return f"Purchase - {self.product.name} ({self.quantity})"
@@ -63,24 +292,184 @@ class Purchase(models.Model):
 # ---------------------
 # Sale
 # ---------------------
-class Sale(models.Model):
+class SaleQuerySet(models.QuerySet):
+    def between(self, start=None, end=None):
+        queryset = self
+        if start:
+            queryset = queryset.filter(sold_at__gte=start)
+        if end:
+            queryset = queryset.filter(sold_at__lt=end)
+        return queryset
+
+    def cogs(self):
+        return self.aggregate(total=Coalesce(Sum('cost_amount'), Decimal('0')))['total']
+
+
+class Sale(StockMovementMixin, models.Model):
+    tracked_fields = ('amount', 'quantity', 'cost_amount', 'product_id')
+    stock_sign = -1
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_per_unit = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # cost_amount / quantity
+    cost_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # from the cost layers used up
     amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True)
     sold_at = models.DateTimeField(auto_now_add=True)
     sold_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    objects = SaleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sold_at', 'id'], name='sale_time_idx'),
+            models.Index(fields=['product', 'sold_at'], name='sale_product_time_idx'),
+        ]
+
+    @property
+    def cogs(self):
+        return self.cost_amount
+
+    def returned_unit_cost(self):
+        quantity = self.loaded_value('quantity')
+        return (self.loaded_value('cost_amount') or 0) / quantity if quantity else None
+
+    def apply_cost(self, old_quantity, old_cost):
+        """Set the cost of going from ``old_quantity`` units costing
+        ``old_cost`` to ``quantity``: more units come out of the cost layers,
+        fewer go back in at this sale's unit cost. Returns the change in
+        stock value."""
+        change = self.quantity - old_quantity
+        if change >= 0:
+            costs, value = CostLayer.issue([(self.product_id, change, self.product.buying_price)])
+            self.cost_amount = old_cost + costs[0]
+            value = -value
+        else:
+            unit_cost = old_cost / old_quantity
+            value = CostLayer.receive([(self.product_id, -change, unit_cost, None)])
+            self.cost_amount = old_cost - (unit_cost * -change).quantize(CENT)
+        self.cost_per_unit = (self.cost_amount / self.quantity).quantize(CENT) if self.quantity else Decimal('0')
+        return value
+
+    def summary_values(self):
+        return {'sales_total': self.amount, 'units_sold': self.quantity, 'cogs': self.cogs}
+
     def save(self, *args, **kwargs):
         self.amount = self.price_per_unit * self.quantity
 
-        if self.product.quantity < self.quantity:
-            raise ValidationError("Insufficient stock for sale.")
+        with transaction.atomic():
+            old_quantity = self.restore_previous_product_stock()
+            self.product.change_stock(old_quantity - self.quantity, kind=None)
+
+            old_amount = self.loaded_value('amount') or 0
+            old_cogs = self.loaded_value('cost_amount') or 0
+            # A switched product already took the old units back at their cost
+            value = self.apply_cost(old_quantity, old_cogs if old_quantity else Decimal('0'))
+            super().save(*args, **kwargs)
+            StockMovement.record([(self.product_id, StockMovement.SALE, old_quantity - self.quantity, self.pk)])
+            Totals.bump(
+                total_sales=self.amount - old_amount,
+                cogs=self.cogs - old_cogs,
+                inventory_value=value,
+            )
+            DailySummary.record_many([
+                (self.sold_at, self.loaded_value('product_id'), {
+                    'sales_total': -old_amount,
+                    'units_sold': -(self.loaded_value('quantity') or 0),
+                    'cogs': -old_cogs,
+                }),
+                (self.sold_at, self.product_id, self.summary_values()),
+            ])
+
+        self.remember_loaded_values()
+
+    @classmethod
+    def checkout(cls, items, sold_by=None):
+        """Record a whole cart in one transaction.
 
-        self.product.quantity -= self.quantity
-        self.product.save()
+        ``items`` is a list of ``{'product': id, 'quantity': n}`` dicts with
+        an optional ``price_per_unit`` (defaults to the selling price) and the
+        ``sku`` it was scanned as, which must still belong to it. The
+        products are locked in one query, stock is checked for the cart as a
+        whole, the decrements go out as one UPDATE and the sales as one
+        INSERT. Raises ValidationError listing every short product."""
+        needed = defaultdict(int)
+        for item in items:
+            needed[item['product']] += item['quantity']
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            products = Product.objects.select_for_update().order_by('pk').in_bulk(list(needed))
+
+            errors = []
+            for product_id, quantity in needed.items():
+                product = products.get(product_id)
+                if product is None:
+                    errors.append(f"Product {product_id} does not exist.")
+                elif product.quantity < quantity:
+                    errors.append(
+                        f"Insufficient stock for '{product.name}'. Only {product.quantity} items available."
+                    )
+            # Codes were resolved from a per-process cache; one reassigned since
+            # must not sell whichever product held it before
+            moved = {
+                item['sku'] for item in items
+                if item.get('sku') and item['product'] in products and products[item['product']].sku != item['sku']
+            }
+            errors += [f"Product code '{code}' has changed; scan it again." for code in sorted(moved)]
+            if errors:
+                raise ValidationError(errors)
+
+            Product.objects.filter(pk__in=list(needed)).update(quantity=Case(
+                *[When(pk=product_id, then=F('quantity') - quantity) for product_id, quantity in needed.items()],
+                default=F('quantity'),
+            ))
+
+            costs, layer_value = CostLayer.issue([
+                (item['product'], item['quantity'], products[item['product']].buying_price) for item in items
+            ])
+            sales = []
+            for item, cost in zip(items, costs):
+                product = products[item['product']]
+                price = item.get('price_per_unit')
+                if price is None:
+                    price = product.selling_price
+                sales.append(cls(
+                    product=product,
+                    quantity=item['quantity'],
+                    price_per_unit=price,
+                    cost_per_unit=(cost / item['quantity']).quantize(CENT),
+                    cost_amount=cost,
+                    amount=price * item['quantity'],
+                    sold_by=sold_by,
+                ))
+            sales = cls.objects.bulk_create(sales)
+            StockMovement.record((sale.product_id, StockMovement.SALE, -sale.quantity, sale.pk) for sale in sales)
+            TableVersion.bump(Sale, Product)
+            records_created.send(sender=cls, records=sales)
+
+            low_stock_delta = 0
+            stock_changes = []
+            for product_id, quantity in needed.items():
+                product = products[product_id]
+                old_quantity = product.quantity
+                product.quantity -= quantity
+                product.remember_loaded_values()
+                low_stock_delta += int(product.is_low_stock) - int(old_quantity <= product.reorder_level)
+                stock_changes.append((product_id, old_quantity, product.reorder_level, product.quantity, product.reorder_level))
+            StockAlert.record(stock_changes)
+            Totals.bump(
+                total_sales=sum(sale.amount for sale in sales),
+                cogs=sum(sale.cogs for sale in sales),
+                inventory_value=-layer_value,
+                low_stock_count=low_stock_delta,
+            )
+            DailySummary.record_many(
+                (sale.sold_at, sale.product_id, sale.summary_values()) for sale in sales
+            )
+
+        for sale in sales:
+            sale.remember_loaded_values()
+        return sales
 
     def __str__(self):
         return f"Sale - {self.product.name} ({self.quantity})"
@@ -88,12 +477,30 @@ class Sale(models.Model):
 # ---------------------
 # Expense
 # ---------------------
-class Expense(models.Model):
+class Expense(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('amount',)
+
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     spent_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     spent_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['spent_at', 'id'], name='expense_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old_amount = self.loaded_value('amount') or 0
+            super().save(*args, **kwargs)
+            Totals.bump(total_expenses=Decimal(self.amount) - old_amount)
+            DailySummary.record_many([
+                (self.spent_at, None, {'expenses_total': Decimal(self.amount) - old_amount}),
+            ])
+
+        self.remember_loaded_values()
+
     def __str__(self):
         return self.description
 
@@ -111,41 +518,86 @@ class Report(models.Model):
     net_profit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_product_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['generated_at', 'id'], name='report_generated_idx'),
+        ]
+
     def __str__(self):
         return f"Report {self.id} - {self.generated_at.strftime('%Y-%m-%d')}"
 
-    def calculate_total_sales(self):
-        sales = Sale.objects.all()
-        self.total_sales = sum(s.amount for s in sales)
-        self.save()
+    METRIC_FIELDS = ['total_sales', 'total_purchases', 'total_expenses', 'net_profit', 'total_product_price']
 
-    def calculate_total_purchases(self):
-        purchases = Purchase.objects.all()
-        self.total_purchases = sum(p.amount for p in purchases)
-        self.save()
+    def previous_report(self):
+        return Report.objects.filter(
+            generated_at__lt=self.generated_at
+        ).exclude(pk=self.pk).order_by('-generated_at').first()
 
-    def calculate_total_expenses(self):
-        expenses = Expense.objects.all()
-        self.total_expenses = sum(e.amount for e in expenses)
-        self.save()
+    def collect_metrics(self, since=None):
+        """Aggregate every figure in one SELECT over the rows recorded up to
+        ``generated_at`` (and after ``since``, if given), so consecutive
+        reports never count a row twice. Stock value is always a full snapshot."""
+        def recorded_in(queryset, field):
+            queryset = queryset.filter(**{f'{field}__lte': self.generated_at})
+            return queryset.filter(**{f'{field}__gt': since}) if since else queryset
 
-    def calculate_total_product_price(self):
-        self.total_product_price = sum(p.total_value for p in Product.objects.all())
-        self.save()
+        sales = recorded_in(Sale.objects, 'sold_at')
+        return Report.objects.filter(pk=self.pk).values(
+            sales_total=scalar_sum(sales, 'amount'),
+            purchases_total=scalar_sum(recorded_in(Purchase.objects, 'purchased_at'), 'amount'),
+            expenses_total=scalar_sum(recorded_in(Expense.objects, 'spent_at'), 'amount'),
+            cogs_total=scalar_sum(sales, 'cost_amount'),
+            stock_value=scalar_sum(CostLayer.objects.filter(remaining__gt=0), F('remaining') * F('unit_cost')),
+        ).get()
 
-    def calculate_cogs(self):
-        sales = Sale.objects.select_related('product').all()
-        return sum(s.quantity * s.product.buying_price for s in sales)
+    def generate_all_metrics(self, incremental=False):
+        """Fill in the report with one aggregate query and one UPDATE.
 
-    def generate_all_metrics(self):
-        self.calculate_total_sales()
-        self.calculate_total_purchases()
-        self.calculate_total_expenses()
-        self.calculate_total_product_price()
+        In incremental mode the totals carry on from the previous report and
+        only rows recorded between the two reports are aggregated. Rows
+        deleted or edited after that report are not reflected; use a full
+        run to resync."""
+        since = None
+        sales = purchases = expenses = cogs = Decimal('0')
 
-        cogs = self.calculate_cogs()
-        self.net_profit = self.total_sales - cogs - self.total_expenses
-        self.save()
+        previous = self.previous_report() if incremental else None
+        if previous:
+            since = previous.generated_at
+            sales = previous.total_sales
+            purchases = previous.total_purchases
+            expenses = previous.total_expenses
+            cogs = previous.total_sales - previous.total_expenses - previous.net_profit
+
+        metrics = self.collect_metrics(since)
+        self.total_sales = sales + metrics['sales_total']
+        self.total_purchases = purchases + metrics['purchases_total']
+        self.total_expenses = expenses + metrics['expenses_total']
+        self.total_product_price = metrics['stock_value']
+        self.net_profit = self.total_sales - (cogs + metrics['cogs_total']) - self.total_expenses
+        self.save(update_fields=self.METRIC_FIELDS)
+
+
+class ReportPdf(models.Model):
+    """A report's rendered PDF, or the job rendering it, shared by every
+    worker. ``content_hash`` ties it to the report version it shows."""
+    PENDING, READY, FAILED = 'pending', 'ready', 'failed'
+    STATUSES = [(PENDING, 'Pending'), (READY, 'Ready'), (FAILED, 'Failed')]
+
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='pdfs')
+    detailed = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=16)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    pdf = models.BinaryField(null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['report', 'detailed'], name='report_pdf_mode'),
+        ]
+
+    def __str__(self):
+        return f"Report {self.report_id} {'detailed' if self.detailed else 'summary'} PDF: {self.status}"
 
 # ---------------------
 # Setting
@@ -156,4 +608,538 @@ class Setting(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.key
\ No newline at end of file
+        return self.key
+
+# ---------------------
+# Stock Alerts
+# ---------------------
+class StockAlert(models.Model):
+    """One row each time a product crosses its reorder level, so clients can
+    follow ``/api/products/alerts/?after=<id>`` instead of polling the catalogue."""
+    LOW = 'low'
+    RESTOCKED = 'restocked'
+    KIND_CHOICES = [(LOW, 'Low stock'), (RESTOCKED, 'Restocked')]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    reorder_level = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product_id} at {self.quantity}"
+
+    @classmethod
+    def crossing(cls, old_quantity, old_level, quantity, level):
+        was_low, is_low = old_quantity <= old_level, quantity <= level
+        if is_low and not was_low:
+            return cls.LOW
+        if was_low and not is_low:
+            return cls.RESTOCKED
+        return None
+
+    @classmethod
+    def record(cls, changes):
+        """Store an alert for each ``(product_id, old_quantity, old_level,
+        quantity, level)`` change that crosses the threshold; one INSERT at most."""
+        alerts = []
+        for product_id, old_quantity, old_level, quantity, level in changes:
+            kind = cls.crossing(old_quantity, old_level, quantity, level)
+            if kind:
+                alerts.append(cls(product_id=product_id, kind=kind, quantity=quantity, reorder_level=level))
+        return cls.objects.bulk_create(alerts) if alerts else []
+
+# ---------------------
+# Stock Ledger
+# ---------------------
+SNAPSHOT_SETTLE = timedelta(minutes=1)  # how old a movement must be before a snapshot covers it
+
+
+class StockMovement(models.Model):
+    """Append-only: one row per change to a product's stock, so a product's
+    rows always add up to its ``quantity``."""
+    PURCHASE = 'purchase'
+    SALE = 'sale'
+    REVERSAL = 'reversal'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [(PURCHASE, 'Purchase'), (SALE, 'Sale'), (REVERSAL, 'Reversal'), (ADJUSTMENT, 'Adjustment')]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()  # signed: stock added or removed
+    reference = models.PositiveBigIntegerField(null=True, blank=True)  # id of the sale or purchase, if any
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at', 'id'], name='movement_product_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product_id} {self.quantity:+d}"
+
+    @classmethod
+    def record(cls, movements):
+        """Store each non-zero ``(product_id, kind, quantity, reference)``; one INSERT at most."""
+        rows = [
+            cls(product_id=product_id, kind=kind, quantity=quantity, reference=reference)
+            for product_id, kind, quantity, reference in movements if quantity
+        ]
+        return cls.objects.bulk_create(rows) if rows else []
+
+    @classmethod
+    def quantity_before(cls, product_id, moment):
+        """Stock of ``product_id`` just before ``moment``: the last snapshot
+        taken by then plus the movements after it, so the replay never
+        reaches back further than one snapshot interval."""
+        snapshot = StockSnapshot.objects.filter(
+            product_id=product_id, taken_at__lt=moment,
+        ).order_by('-taken_at', '-movement_id').first()
+        movements = cls.objects.filter(product_id=product_id, created_at__lt=moment)
+        quantity = 0
+        if snapshot:
+            movements = movements.filter(created_at__gte=snapshot.taken_at, id__gt=snapshot.movement_id)
+            quantity = snapshot.quantity
+        return quantity + (movements.aggregate(total=Sum('quantity'))['total'] or 0)
+
+
+class StockSnapshot(models.Model):
+    """A product's stock as of one ledger row, the starting point for
+    ``StockMovement.quantity_before``. Taken periodically by ``snapshot_stock``."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    movement_id = models.BigIntegerField()  # last StockMovement included
+    quantity = models.IntegerField()
+    taken_at = models.DateTimeField()  # created_at of that movement
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='snapshot_product_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} = {self.quantity} at {self.taken_at}"
+
+    @classmethod
+    def take(cls, settle=SNAPSHOT_SETTLE):
+        """Snapshot every product whose stock moved since its last snapshot,
+        reading only the movements since then. Returns the new snapshots.
+
+        Movements younger than ``settle`` wait for the next run, so a write
+        still committing can't land behind a snapshot that claims to cover it."""
+        latest = cls.objects.filter(product=OuterRef('product')).order_by('-movement_id').values('movement_id')[:1]
+        pending = list(StockMovement.objects.filter(
+            created_at__lte=timezone.now() - settle,
+            id__gt=Coalesce(Subquery(latest), 0),
+        ).order_by().values('product').annotate(
+            change=Sum('quantity'), last_id=Max('id'), last_at=Max('created_at'),
+        ))
+        if not pending:
+            return []
+
+        previous = dict(cls.objects.filter(
+            product__in=[row['product'] for row in pending], movement_id=Subquery(latest),
+        ).values_list('product', 'quantity'))
+        return cls.objects.bulk_create(
+            cls(
+                product_id=row['product'], movement_id=row['last_id'], taken_at=row['last_at'],
+                quantity=previous.get(row['product'], 0) + row['change'],
+            )
+            for row in pending
+        )
+
+# ---------------------
+# Inventory Costing
+# ---------------------
+FIFO = 'fifo'
+AVERAGE = 'average'
+COSTING_METHODS = (FIFO, AVERAGE)
+CENT = Decimal('0.01')
+
+
+def costing_method():
+    """The shop's 'costing_method' setting: 'fifo' (default) or 'average'."""
+    from .config import get  # config imports this module
+    method = get('costing_method', FIFO).strip().lower()
+    return method if method in COSTING_METHODS else FIFO
+
+
+class CostLayerQuerySet(models.QuerySet):
+    def open_value(self):
+        """``SUM(remaining * unit_cost)`` over the open layers, in one query."""
+        return Decimal(self.filter(remaining__gt=0).aggregate(total=Coalesce(
+            Sum(F('remaining') * F('unit_cost')), Decimal('0'), output_field=models.DecimalField(),
+        ))['total']).quantize(CENT)
+
+
+class CostLayer(models.Model):
+    """Units of a product received at one unit cost, used up oldest first.
+
+    FIFO keeps a layer per receipt. The moving weighted average keeps one
+    open layer per product and re-prices it on each receipt, so sales use
+    the same oldest-first walk either way. Stock value is the open layers'
+    ``remaining * unit_cost``; ``cost_layer_open_idx`` covers only those."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    purchase = models.ForeignKey(Purchase, on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.PositiveIntegerField()  # units received
+    remaining = models.PositiveIntegerField()  # under the average, also the units folded in
+    unit_cost = models.DecimalField(max_digits=14, decimal_places=4)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CostLayerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'id'], condition=Q(remaining__gt=0), name='cost_layer_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.remaining}/{self.quantity} at {self.unit_cost}"
+
+    @classmethod
+    def open_layers(cls, product_ids):
+        """Open layers per product, oldest first, locked for the transaction."""
+        layers = defaultdict(list)
+        for layer in cls.objects.select_for_update().filter(
+            product_id__in=product_ids, remaining__gt=0,
+        ).order_by('product_id', 'id'):
+            layers[layer.product_id].append(layer)
+        return layers
+
+    @classmethod
+    def receive(cls, receipts):
+        """Add ``(product_id, quantity, unit_cost, purchase_id)`` receipts to
+        stock and return the change in stock value."""
+        receipts = [receipt for receipt in receipts if receipt[1] > 0]
+        if not receipts:
+            return Decimal('0')
+        layers = [
+            cls(product_id=product_id, purchase_id=purchase_id, quantity=quantity, remaining=quantity,
+                unit_cost=Decimal(unit_cost).quantize(Decimal('0.0001')))
+            for product_id, quantity, unit_cost, purchase_id in receipts
+        ]
+        value = sum(layer.remaining * layer.unit_cost for layer in layers)
+        if costing_method() == AVERAGE:
+            # Fold each product's open layers and receipts into its oldest open layer
+            pools = cls.open_layers({layer.product_id for layer in layers})
+            value = -sum(layer.remaining * layer.unit_cost for pool in pools.values() for layer in pool)
+            for layer in layers:
+                pools[layer.product_id].append(layer)
+            created, changed = [], []
+            for pool in pools.values():
+                units = sum(layer.remaining for layer in pool)
+                unit_cost = (sum(layer.remaining * layer.unit_cost for layer in pool) / units).quantize(Decimal('0.0001'))
+                value += units * unit_cost
+                head = pool[0]
+                for layer in pool[1:]:
+                    layer.remaining = 0
+                head.remaining, head.unit_cost = units, unit_cost
+                for layer in pool:
+                    (changed if layer.pk else created).append(layer)
+            if changed:
+                cls.objects.bulk_update(changed, ['remaining', 'unit_cost'])
+            layers = created
+        cls.objects.bulk_create(layers)
+        return value.quantize(CENT)
+
+    @classmethod
+    def issue(cls, demands):
+        """Take ``(product_id, quantity, fallback_cost)`` demands out of stock,
+        in order, from the oldest open layers. Returns the cost of each
+        demand and the stock value removed. Units no layer covers (counted
+        in without a cost) are costed at ``fallback_cost``."""
+        layers = cls.open_layers({product_id for product_id, quantity, _ in demands if quantity > 0})
+        costs, used, removed = [], {}, Decimal('0')
+        for product_id, quantity, fallback_cost in demands:
+            cost, pool = Decimal('0'), layers.get(product_id, [])
+            while quantity > 0 and pool:
+                layer = pool[0]
+                taken = min(quantity, layer.remaining)
+                layer.remaining -= taken
+                quantity -= taken
+                cost += taken * layer.unit_cost
+                used[layer.pk] = layer
+                if not layer.remaining:
+                    pool.pop(0)
+            removed += cost
+            costs.append((cost + max(quantity, 0) * fallback_cost).quantize(CENT))
+        if used:
+            cls.objects.bulk_update(list(used.values()), ['remaining'])
+        return costs, removed.quantize(CENT)
+
+    @classmethod
+    def adjust(cls, product_id, delta, unit_cost, purchase_id=None):
+        """Stock in (at ``unit_cost``) or out (oldest first) outside a sale;
+        returns the change in stock value."""
+        if delta > 0:
+            return cls.receive([(product_id, delta, unit_cost, purchase_id)])
+        if delta < 0:
+            return -cls.issue([(product_id, -delta, unit_cost)])[1]
+        return Decimal('0')
+
+# ---------------------
+# Running Totals
+# ---------------------
+class Totals(models.Model):
+    """Single-row ledger of dashboard figures, kept up to date by the writes
+    in this module so ``overview`` never has to scan the history tables."""
+    SINGLETON_ID = 1
+
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_purchases = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_expenses = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cogs = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    inventory_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    low_stock_count = models.IntegerField(default=0)
+    product_count = models.IntegerField(default=0)
+    user_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'totals'
+
+    def __str__(self):
+        return f"Totals (updated {self.updated_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def net_profit(self):
+        return self.total_sales - self.cogs - self.total_expenses
+
+    @classmethod
+    def current(cls):
+        totals = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        return totals or cls.rebuild()
+
+    @classmethod
+    def bump(cls, **deltas):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            # First write since the table was created: build the row from
+            # the current state, which already includes this change.
+            cls.rebuild()
+
+    @classmethod
+    def apply_product(cls, product, sign=1, inventory_value=0):
+        cls.bump(
+            inventory_value=inventory_value,
+            low_stock_count=sign * int(product.is_low_stock),
+            product_count=sign,
+        )
+
+    @staticmethod
+    def product_change_deltas(old_quantity, quantity, old_level, level):
+        return {'low_stock_count': int(quantity <= level) - int(old_quantity <= old_level)}
+
+    @classmethod
+    def apply_product_change(cls, old_quantity, quantity, old_level, level, inventory_value=0):
+        """``inventory_value`` is the change in stock value from the cost layers."""
+        cls.bump(inventory_value=inventory_value, **cls.product_change_deltas(old_quantity, quantity, old_level, level))
+
+    @classmethod
+    def rebuild(cls):
+        zero = Decimal('0')
+
+        def total(queryset, expression):
+            return queryset.aggregate(
+                total=Coalesce(Sum(expression), zero, output_field=models.DecimalField())
+            )['total']
+
+        products = Product.objects.aggregate(
+            count=Count('id'),
+            low=Count('id', filter=Q(quantity__lte=F('reorder_level'))),
+        )
+        values = {
+            'total_sales': total(Sale.objects, 'amount'),
+            'total_purchases': total(Purchase.objects, 'amount'),
+            'total_expenses': total(Expense.objects, 'amount'),
+            'cogs': Sale.objects.cogs(),
+            'inventory_value': CostLayer.objects.open_value(),
+            'low_stock_count': products['low'],
+            'product_count': products['count'],
+            'user_count': User.objects.count(),
+        }
+        totals, _ = cls.objects.update_or_create(pk=cls.SINGLETON_ID, defaults=values)
+        return totals
+
+
+# ---------------------
+# Daily Summary
+# ---------------------
+def local_date(moment):
+    return timezone.localtime(moment, timezone.get_default_timezone()).date()
+
+
+class DailySummary(models.Model):
+    """Per-day rollup of sales, purchases and expenses, keyed by the local
+    date in ``TIME_ZONE``. Rows with a product hold that product's share;
+    the row without one is the whole shop, expenses included."""
+    VALUE_FIELDS = ['sales_total', 'units_sold', 'cogs', 'purchases_total', 'units_purchased', 'expenses_total']
+
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
+
+    sales_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units_sold = models.IntegerField(default=0)
+    cogs = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchases_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units_purchased = models.IntegerField(default=0)
+    expenses_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily summaries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'product'], condition=Q(product__isnull=False), name='daily_summary_product_day',
+            ),
+            models.UniqueConstraint(
+                fields=['date'], condition=Q(product__isnull=True), name='daily_summary_shop_day',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Summary {self.date} - {self.product_id or 'shop'}"
+
+    @classmethod
+    def record_many(cls, entries, create=True, retry=True):
+        """Add ``(moment, product_id, deltas)`` entries to their day rows and
+        to the shop-wide row of that day, in a few queries whatever the count.
+
+        Deletes pass ``create=False`` so a cascade never recreates rows for a
+        product that is on its way out."""
+        merged = defaultdict(Counter)
+        for moment, product_id, deltas in entries:
+            day = local_date(moment)
+            for key in {(day, product_id), (day, None)}:
+                merged[key].update(deltas)
+        merged = {key: deltas for key, deltas in merged.items() if any(deltas.values())}
+        if not merged:
+            return
+
+        days = {day for day, _ in merged}
+        product_ids = {product_id for _, product_id in merged if product_id}
+        existing = {
+            (row.date, row.product_id): row
+            for row in cls.objects.select_for_update().filter(
+                Q(product__isnull=True) | Q(product_id__in=product_ids), date__in=days,
+            )
+        }
+
+        changed, missing = [], []
+        for (day, product_id), deltas in merged.items():
+            row = existing.get((day, product_id))
+            if row:
+                for field, delta in deltas.items():
+                    setattr(row, field, getattr(row, field) + delta)
+                changed.append(row)
+            elif create:
+                missing.append(cls(date=day, product_id=product_id, **deltas))
+
+        if changed:
+            cls.objects.bulk_update(changed, cls.VALUE_FIELDS)
+        if missing:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(missing)
+            except IntegrityError:
+                if not retry:
+                    raise
+                # Another writer created one of the day rows first; go round once more.
+                cls.record_many(
+                    [(row.date, row.product_id, {f: getattr(row, f) for f in cls.VALUE_FIELDS}) for row in missing],
+                    retry=False,
+                )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        tz = timezone.get_default_timezone()
+        rows = defaultdict(Counter)
+
+        def collect(queryset, date_field, values):
+            grouped = queryset.annotate(day=TruncDate(date_field, tzinfo=tz)).values('day', 'product_id').annotate(
+                **values
+            ).order_by()
+            for group in grouped.iterator():
+                deltas = {field: group[field] for field in values}
+                rows[(group['day'], group['product_id'])].update(deltas)
+                rows[(group['day'], None)].update(deltas)
+
+        collect(Sale.objects, 'sold_at', {
+            'sales_total': Sum('amount'), 'units_sold': Sum('quantity'),
+            'cogs': Sum('cost_amount'),
+        })
+        collect(Purchase.objects, 'purchased_at', {
+            'purchases_total': Sum('amount'), 'units_purchased': Sum('quantity'),
+        })
+        expenses = Expense.objects.annotate(day=TruncDate('spent_at', tzinfo=tz)).values('day').annotate(
+            expenses_total=Sum('amount')
+        ).order_by()
+        for group in expenses.iterator():
+            rows[(group['day'], None)]['expenses_total'] += group['expenses_total']
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                (cls(date=day, product_id=product_id, **values) for (day, product_id), values in rows.items()),
+                batch_size=batch_size,
+            )
+        return len(rows)
+
+
+# ---------------------
+# Table Versions
+# ---------------------
+tables_changed = Signal()  # sent with ``models`` whenever TableVersion.bump runs
+records_created = Signal()  # sent with ``records`` by bulk inserts that skip post_save
+
+
+class TableVersion(models.Model):
+    """Write counter per table, bumped in the same transaction as the write.
+
+    Conditional GETs compare these instead of reading the tables themselves."""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @staticmethod
+    def names(models_):
+        return sorted({model._meta.model_name for model in models_})
+
+    @classmethod
+    def bump(cls, *models_):
+        names = cls.names(models_)
+        updated = cls.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=Now())
+        if updated < len(names):
+            for name in names:
+                cls.objects.get_or_create(name=name, defaults={'version': 1})
+        tables_changed.send(sender=cls, models=models_)
+
+    @classmethod
+    def bump_counter(cls, name):
+        """Move on a counter that belongs to no table, such as the source of a
+        per-process cache, and return its new value. Sends no signal."""
+        counters = cls.objects.filter(name=name)
+        if not counters.update(version=F('version') + 1, updated_at=Now()):
+            cls.objects.get_or_create(name=name)
+            counters.update(version=F('version') + 1, updated_at=Now())
+        return counters.values_list('version', flat=True).get()
+
+    @classmethod
+    def counter(cls, name):
+        return cls.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def current(cls, *models_):
+        """``{name: (version, updated_at)}`` for the given models in one query."""
+        return {
+            name: (version, updated_at)
+            for name, version, updated_at in cls.objects.filter(name__in=cls.names(models_)).values_list(
+                'name', 'version', 'updated_at'
+            )
+        }
@@ -0,0 +1,76 @@
+import json
+from functools import reduce
+from operator import or_
+from django.db.models import Q
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+# ---------------------
+# Keyset (Cursor) Pagination
+# ---------------------
+class KeysetPagination(CursorPagination):
+    """Cursor pagination ordered on the view's ``cursor_ordering``.
+
+    The cursor holds the values of every ordering field of the row at the
+    page edge, and the next page is the rows strictly after them, so rows
+    sharing a date never repeat or go missing, in either direction.
+
+    Every list answers one page: ``page_size`` rows (default 50, at most
+    500) plus ``next`` and ``previous`` links."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, json.loads(position)))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next, self.has_previous = (position is not None, more) if reverse else (more, position is not None)
+        self.edge = position  # for an empty page, both links stay where we are
+        self.display_page_controls = (self.has_previous or self.has_next) and self.template is not None
+        return self.page
+
+    @staticmethod
+    def after(ordering, values):
+        """Rows strictly after ``values`` in ``ordering``:
+        ``a > x OR (a = x AND b > y) ...``, with < for descending fields."""
+        conditions, equal = [], Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            conditions.append(equal & Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value}))
+            equal &= Q(**{name: value})
+        return reduce(or_, conditions)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.edge
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.edge
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        values = [instance[f] if isinstance(instance, dict) else getattr(instance, f) for f in fields]
+        return json.dumps([str(value) for value in values])
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
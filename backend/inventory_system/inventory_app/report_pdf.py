@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import Report, ReportPdf, Sale
+
+logger = logging.getLogger(__name__)
+
+JOB_TIMEOUT = timedelta(minutes=10)  # a job pending longer than this died with its worker
+RENDER_WORKERS = 2
+EXPIRED, MISSING = 'expired', 'missing'  # job states on top of ReportPdf.STATUSES
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# ---------------------
+# Stored PDFs
+# ---------------------
+def content_hash(report):
+    """Hash of everything the PDF shows, so an edited report never hits an
+    old render even if the explicit invalidation was missed."""
+    parts = [
+        report.pk, report.generated_by.username if report.generated_by else '',
+        report.generated_at.isoformat(), report.notes,
+        *(f'{getattr(report, field):.2f}' for field in Report.METRIC_FIELDS),
+    ]
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def invalidate(report):
+    ReportPdf.objects.filter(report=report).delete()
+
+
+# ---------------------
+# Rendering
+# ---------------------
+def render(report, detailed=False):
+    # ReportLab is only needed here; keep it off the views import path
+    from reportlab.lib.pagesizes import A4  # pyright: ignore[reportMissingModuleSource]
+    from reportlab.pdfgen import canvas     # pyright: ignore[reportMissingModuleSource]
+
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, f"📊 Financial Report #{report.id}")
+
+    p.setFont("Helvetica", 12)
+    p.drawString(50, height - 80, f"Generated By: {report.generated_by.username if report.generated_by else '—'}")
+    p.drawString(50, height - 100, f"Date: {report.generated_at.strftime('%Y-%m-%d %H:%M')}")
+
+    y = height - 140
+    p.drawString(50, y, f"Total Sales: TSh {report.total_sales:,.2f}")
+    p.drawString(50, y - 20, f"Total Purchases: TSh {report.total_purchases:,.2f}")
+    p.drawString(50, y - 40, f"Total Expenses: TSh {report.total_expenses:,.2f}")
+    p.drawString(50, y - 60, f"Net Profit: TSh {report.net_profit:,.2f}")
+    p.drawString(50, y - 80, f"Total Product Value: TSh {report.total_product_price:,.2f}")
+
+    p.drawString(50, y - 120, "Notes:")
+    text_obj = p.beginText(50, y - 140)
+    text_obj.setFont("Helvetica-Oblique", 11)
+    for line in report.notes.splitlines():
+        text_obj.textLine(line)
+    p.drawText(text_obj)
+
+    p.showPage()
+    if detailed:
+        draw_line_items(p, report, width, height)
+    p.save()
+    return buffer.getvalue()
+
+
+def draw_line_items(p, report, width, height):
+    """Sales per product up to the report date, as many pages as it takes."""
+    items = Sale.objects.filter(sold_at__lte=report.generated_at).values('product__name').annotate(
+        units=Sum('quantity'),
+        revenue=Sum('amount'),
+        cogs=Sum('cost_amount'),
+    ).order_by('product__name')
+
+    def header():
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(50, height - 50, f"Sales by Product — Report #{report.id}")
+        p.setFont("Helvetica-Bold", 10)
+        for x, title in ((50, "Product"), (300, "Units"), (370, "Revenue (TSh)"), (470, "COGS (TSh)")):
+            p.drawString(x, height - 75, title)
+        p.setFont("Helvetica", 10)
+        return height - 95
+
+    y = header()
+    for item in items.iterator():
+        if y < 50:
+            p.showPage()
+            y = header()
+        p.drawString(50, y, str(item['product__name'])[:40])
+        p.drawRightString(340, y, f"{item['units']:,}")
+        p.drawRightString(450, y, f"{item['revenue']:,.2f}")
+        p.drawRightString(550, y, f"{item['cogs']:,.2f}")
+        y -= 16
+    p.showPage()
+
+
+def cached_pdf(report, detailed=False):
+    pdf = ReportPdf.objects.filter(
+        report=report, detailed=detailed, content_hash=content_hash(report), status=ReportPdf.READY,
+    ).values_list('pdf', flat=True).first()
+    return None if pdf is None else bytes(pdf)
+
+
+def render_cached(report):
+    """Summary PDF, rendered at most once per report version by any worker."""
+    pdf = cached_pdf(report)
+    if pdf is None:
+        pdf = render(report)
+        ReportPdf.objects.update_or_create(report=report, detailed=False, defaults={
+            'content_hash': content_hash(report), 'status': ReportPdf.READY, 'pdf': pdf,
+            'started_at': timezone.now(), 'finished_at': timezone.now(),
+        })
+    return pdf
+
+
+# ---------------------
+# Background Rendering
+# ---------------------
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='report-pdf')
+        return _executor
+
+
+def job_status(report):
+    """``ready``, ``pending``, ``failed``, ``expired`` (its worker died) or ``missing``."""
+    job = ReportPdf.objects.defer('pdf').filter(report=report, detailed=True).first()
+    if job is None or job.content_hash != content_hash(report):
+        return MISSING
+    if job.status == ReportPdf.PENDING and job.started_at < timezone.now() - JOB_TIMEOUT:
+        return EXPIRED
+    return job.status
+
+
+def claim(report, digest):
+    """Take the detailed job for this report version; True for exactly one
+    caller, across workers. Failed, expired and out-of-date jobs are taken
+    over by a conditional UPDATE, so only one request restarts them."""
+    now = timezone.now()
+    job, created = ReportPdf.objects.get_or_create(
+        report=report, detailed=True, defaults={'content_hash': digest, 'started_at': now},
+    )
+    if created:
+        return True
+    takeover = ~Q(content_hash=digest) | Q(status=ReportPdf.FAILED) | Q(
+        status=ReportPdf.PENDING, started_at__lt=now - JOB_TIMEOUT,
+    )
+    return bool(ReportPdf.objects.filter(takeover, pk=job.pk).update(
+        content_hash=digest, status=ReportPdf.PENDING, pdf=None, started_at=now, finished_at=None,
+    ))
+
+
+def render_in_background(report):
+    """Queue the detailed PDF unless it is stored or already under way."""
+    if cached_pdf(report, detailed=True) is not None:
+        return ReportPdf.READY
+    digest = content_hash(report)
+    if claim(report, digest):
+        transaction.on_commit(lambda: get_executor().submit(run_job, report.pk, digest))
+    return job_status(report)
+
+
+def run_job(report_id, digest):
+    try:
+        finish_job(report_id, digest)
+    finally:
+        connection.close()  # this pool thread's own connection
+
+
+def finish_job(report_id, digest):
+    """Render the detailed PDF of report version ``digest`` and store it, or
+    mark the job failed."""
+    job = ReportPdf.objects.filter(report_id=report_id, detailed=True, content_hash=digest, status=ReportPdf.PENDING)
+    try:
+        report = Report.objects.select_related('generated_by').get(pk=report_id)
+        pdf = render(report, detailed=True)
+    except Exception:
+        logger.exception("Rendering detailed PDF for report %s failed", report_id)
+        job.update(status=ReportPdf.FAILED, finished_at=timezone.now())
+        return
+    job.update(status=ReportPdf.READY, pdf=pdf, finished_at=timezone.now())
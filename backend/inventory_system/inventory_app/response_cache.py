@@ -0,0 +1,131 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from .models import TableVersion
+
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+COUNTERS = ('hits', 'misses', 'shared')
+
+_views = {}  # name -> models the cached output depends on
+
+
+def backend():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def default_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+
+# ---------------------
+# Keys
+# ---------------------
+def generation(name, request):
+    """The versions of the tables view ``name`` depends on. They move in the
+    same transaction as any write, from any process, so a key built from
+    them never outlives the data. Reuses what ``conditional_on`` read for
+    the same request."""
+    names = TableVersion.names(_views[name])
+    seen, versions = getattr(request, 'table_versions', (None, None))
+    if seen != frozenset(names):
+        versions = TableVersion.current(*_views[name])
+    return '.'.join(str(versions.get(table, (0, None))[0]) for table in names)
+
+
+def data_key(name, generation, request):
+    return f'response-cache:{name}:{generation}:{request.get_full_path()}'
+
+
+def counter_key(name, counter):
+    return f'response-cache:{name}:{counter}'
+
+
+def increment(key):
+    store = backend()
+    store.add(key, 0, timeout=None)
+    try:
+        return store.incr(key)
+    except ValueError:  # evicted between add and incr
+        store.set(key, 1, timeout=None)
+        return 1
+
+
+# ---------------------
+# Lookup
+# ---------------------
+def cached_or_compute(name, request, compute, timeout):
+    store = backend()
+    key = data_key(name, generation(name, request), request)
+
+    data = store.get(key)
+    if data is not None:
+        increment(counter_key(name, 'hits'))
+        return data
+
+    # ✅ Single flight: one request recomputes, the rest wait for its result
+    lock = key + ':lock'
+    if store.add(lock, 1, timeout=LOCK_TIMEOUT):
+        try:
+            data = compute()
+            if data is not None:
+                store.set(key, data, timeout=timeout)
+        finally:
+            store.delete(lock)
+        increment(counter_key(name, 'misses'))
+        return data
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        data = store.get(key)
+        if data is not None:
+            increment(counter_key(name, 'shared'))
+            return data
+        if store.get(lock) is None:
+            break
+    increment(counter_key(name, 'misses'))
+    return compute()
+
+
+def cached_response(name, depends_on, timeout=None):
+    """Cache a function view's response data until a write to one of
+    ``depends_on`` or the TTL expires. Apply inside ``@api_view``, under
+    ``@conditional_on`` with the same models to share its version lookup."""
+    _views[name] = tuple(depends_on)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            responses = []
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                responses.append(response)
+                return response.data if response.status_code == 200 else None
+
+            data = cached_or_compute(name, request, compute, timeout or default_timeout())
+            if data is None:
+                return responses[0]
+            return Response(data)
+        return wrapper
+    return decorator
+
+
+def stats():
+    store = backend()
+    result = {}
+    for name in sorted(_views):
+        counts = store.get_many([counter_key(name, counter) for counter in COUNTERS])
+        result[name] = {counter: counts.get(counter_key(name, counter), 0) for counter in COUNTERS}
+    return result
+
+
+def reset_stats():
+    backend().delete_many([counter_key(name, counter) for name in _views for counter in COUNTERS])
@@ -0,0 +1,174 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from itertools import chain
+from django.db import connection
+from .config import SharedVersion
+from .models import Product, SEARCH_FIELDS
+
+WORD_RE = re.compile(r'\w+')
+MAX_CHAR = chr(0x10FFFF)  # sorts after any name
+
+
+def words(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+# ---------------------
+# In-process Prefix Index (SQLite fallback)
+# ---------------------
+class PrefixIndex:
+    """Per field, sorted ``(word, name, product_id)`` entries, so the products
+    with a word starting with a prefix come out of a bisect already ordered by
+    name; plus sorted ``(name, product_id)`` for whole-name prefixes."""
+
+    def __init__(self):
+        self.names = []
+        self.entries = {field: [] for field in SEARCH_FIELDS}
+        self.documents = {}  # product_id -> (name, {field: words})
+        self.generation = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def document(fields):
+        return (fields['name'] or '').lower(), {field: set(words(fields[field])) for field in SEARCH_FIELDS}
+
+    def rebuild(self, generation=None):
+        names, entries, documents = [], {field: [] for field in SEARCH_FIELDS}, {}
+        for row in Product.objects.values_list('id', *SEARCH_FIELDS).iterator(chunk_size=2000):
+            product_id = row[0]
+            name, field_words = documents[product_id] = self.document(dict(zip(SEARCH_FIELDS, row[1:])))
+            names.append((name, product_id))
+            for field, values in field_words.items():
+                entries[field].extend((word, name, product_id) for word in values)
+        names.sort()
+        for field_entries in entries.values():
+            field_entries.sort()
+        with self.lock:
+            self.names, self.entries, self.documents, self.generation = names, entries, documents, generation
+
+    def add(self, product):
+        with self.lock:
+            self.remove(product.pk)
+            name, field_words = self.documents[product.pk] = self.document(
+                {field: getattr(product, field) for field in SEARCH_FIELDS}
+            )
+            insort(self.names, (name, product.pk))
+            for field, values in field_words.items():
+                for word in values:
+                    insort(self.entries[field], (word, name, product.pk))
+
+    def remove(self, product_id):
+        with self.lock:
+            document = self.documents.pop(product_id, None)
+            if document is None:
+                return
+            name, field_words = document
+            self.discard(self.names, (name, product_id))
+            for field, values in field_words.items():
+                for word in values:
+                    self.discard(self.entries[field], (word, name, product_id))
+
+    @staticmethod
+    def discard(sorted_list, item):
+        position = bisect_left(sorted_list, item)
+        if position < len(sorted_list) and sorted_list[position] == item:
+            del sorted_list[position]
+
+    def name_prefixed(self, prefix):
+        position = bisect_left(self.names, (prefix,))
+        while position < len(self.names) and self.names[position][0].startswith(prefix):
+            yield self.names[position][1]
+            position += 1
+
+    def word_prefixed(self, field, prefix):
+        """Product ids with a ``field`` word starting with ``prefix``, by name.
+
+        Each distinct word is a run already sorted by name; merging the runs
+        lazily means a page costs O(limit) however broad the prefix."""
+        entries, runs = self.entries[field], []
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and entries[position][0].startswith(prefix):
+            run_end = bisect_left(entries, (entries[position][0], MAX_CHAR), position)
+            runs.append(entries[i][1:] for i in range(position, run_end))
+            position = run_end
+        return (product_id for _, product_id in heapq.merge(*runs))
+
+    def has_word_prefixed(self, product_id, prefix):
+        return any(word.startswith(prefix) for values in self.documents[product_id][1].values() for word in values)
+
+    def search(self, query, limit):
+        """Ids of products with a word starting with every term of ``query``:
+        whole-name prefix first, then by the field the longest term matched
+        (name, category, description), then by name."""
+        terms = words(query)
+        if not terms:
+            return []
+        query = query.strip().lower()
+        key_term = max(terms, key=len)  # the most selective term drives the walk
+        other_terms = list(terms)
+        other_terms.remove(key_term)
+
+        found = []
+        with self.lock:
+            candidates = [self.name_prefixed(query)]
+            candidates += [self.word_prefixed(field, key_term) for field in SEARCH_FIELDS]
+            # Walk the tiers best first and stop as soon as the page is full
+            for product_id in chain.from_iterable(candidates):
+                if product_id in found:
+                    continue
+                if all(self.has_word_prefixed(product_id, term) for term in other_terms):
+                    found.append(product_id)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+index = PrefixIndex()
+
+
+version = SharedVersion('product-search')
+
+
+def current_index():
+    """The process-local index, rebuilt when any process changed products
+    (seen within a few seconds through the version in the database)."""
+    generation = version.get()
+    if index.generation != generation:
+        index.rebuild(generation)
+    return index
+
+
+def touch(apply=None):
+    """Record a product text change: apply it locally, then move the shared
+    version on so other processes rebuild on their next search."""
+    if connection.vendor == 'postgresql':
+        return  # searched in the database; there is no index to keep
+    with index.lock:
+        in_sync = index.generation == version.get(fresh=True)
+        if apply and in_sync:
+            apply(index)
+        generation = version.bump()
+        if apply and in_sync:
+            index.generation = generation
+
+
+def product_saved(sender, instance, **kwargs):
+    touch(lambda idx: idx.add(instance))
+
+
+def product_deleted(sender, instance, **kwargs):
+    touch(lambda idx: idx.remove(instance.pk))
+
+
+# ---------------------
+# Search
+# ---------------------
+def search_products(query, limit=10):
+    """Up to ``limit`` products for ``query``, best match first."""
+    if connection.vendor == 'postgresql':
+        return list(Product.objects.search(query)[:limit])
+    ids = current_index().search(query, limit)
+    products = Product.objects.in_bulk(ids)
+    return [products[product_id] for product_id in ids if product_id in products]
@@ -0,0 +1,155 @@
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from . import barcodes, search
+from .models import (
+    Product, Purchase, Sale, Expense, User, Totals, DailySummary, TableVersion, StockMovement, CostLayer,
+)
+
+SEED_BATCH_SIZE = 2000
+BENCH_USERNAME = 'bench-seller'
+
+CATEGORIES = ['Beverages', 'Dairy', 'Bakery', 'Grains', 'Snacks', 'Household', 'Toiletries', 'Stationery']
+ADJECTIVES = ['Fresh', 'Classic', 'Family', 'Premium', 'Everyday', 'Golden', 'Mini', 'Value']
+NOUNS = ['Juice', 'Milk', 'Bread', 'Rice', 'Biscuits', 'Soap', 'Sugar', 'Flour', 'Tea', 'Notebook']
+EXPENSE_KINDS = ['Rent', 'Electricity', 'Water', 'Transport', 'Wages', 'Packaging', 'Internet']
+SALE_QUANTITIES = [1, 1, 1, 1, 2, 2, 3, 5]  # most tills sell one at a time
+POPULARITY_SKEW = 0.8  # product n sells about 1 / n ** skew as often as the best seller
+
+
+# ---------------------
+# Helpers
+# ---------------------
+@contextmanager
+def backdated(*models_):
+    """Let ``bulk_create`` keep the timestamps we set on ``auto_now_add``
+    fields. Changes the field definitions for the whole process, so only
+    for commands, never inside a running server."""
+    fields = [field for model in models_ for field in model._meta.concrete_fields if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def day_times(rng, day_start, count):
+    """``count`` sorted moments within the opening hours of one day."""
+    return [day_start + timedelta(hours=8, seconds=s) for s in sorted(rng.randrange(12 * 3600) for _ in range(count))]
+
+
+# ---------------------
+# Synthetic Data
+# ---------------------
+def seed_bench(products=1000, sales=100000, expenses=None, days=365, seed=0, batch_size=SEED_BATCH_SIZE):
+    """Add ``products`` products and ``sales`` sales spread over the last
+    ``days`` days, with the opening purchases that cover them and
+    ``expenses`` expenses (one per 50 sales by default). The same ``seed``
+    gives the same data.
+
+    Rows go in with ``bulk_create``, a day at a time, together with their
+    stock movements, cost layers and daily summaries; totals, versions and
+    lookup indexes are brought up to date at the end. Returns the counts."""
+    rng = random.Random(seed)
+    expenses = max(days, sales // 50) if expenses is None else expenses
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+
+    # Decide every sale up front so the opening stock covers them all
+    weights = [1 / (n + 1) ** POPULARITY_SKEW for n in range(products)]
+    picks = rng.choices(range(products), weights=weights, k=sales) if products else []
+    quantities = rng.choices(SALE_QUANTITIES, k=len(picks))
+    sold = Counter()
+    for pick, quantity in zip(picks, quantities):
+        sold[pick] += quantity
+
+    with transaction.atomic(), backdated(Product, Purchase, Sale, Expense, CostLayer):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'is_staff_user': True})
+        first_sku = (Product.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+        catalogue = []
+        for n in range(products):
+            buying_price = money(rng.randrange(200, 50000, 50))
+            leftover = rng.randrange(40)  # some end up below their reorder level
+            catalogue.append(Product(
+                name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n + 1}",
+                sku=f"BENCH{first_sku + n:08d}",
+                category=rng.choice(CATEGORIES),
+                buying_price=buying_price,
+                selling_price=money(buying_price * Decimal(rng.uniform(1.1, 1.6))),
+                quantity=leftover,
+                reorder_level=10,
+                created_at=start,
+            ))
+        Product.objects.bulk_create(catalogue, batch_size=batch_size)
+
+        purchases = [
+            Purchase(
+                product=product, quantity=sold[n] + product.quantity, price_per_unit=product.buying_price,
+                amount=product.buying_price * (sold[n] + product.quantity), purchased_by=user, purchased_at=start,
+            )
+            for n, product in enumerate(catalogue) if sold[n] + product.quantity
+        ]
+        Purchase.objects.bulk_create(purchases, batch_size=batch_size)
+        StockMovement.objects.bulk_create((
+            StockMovement(product_id=p.product_id, kind=StockMovement.PURCHASE, quantity=p.quantity,
+                          reference=p.pk, created_at=start)
+            for p in purchases
+        ), batch_size=batch_size)
+        CostLayer.objects.bulk_create((
+            CostLayer(product_id=p.product_id, purchase_id=p.pk, quantity=p.quantity,
+                      remaining=p.product.quantity, unit_cost=p.price_per_unit, created_at=start)
+            for p in purchases
+        ), batch_size=batch_size)
+        DailySummary.record_many((start, p.product_id, p.summary_values()) for p in purchases)
+
+        done, expensed = 0, 0
+        for day in range(days):
+            day_start = start + timedelta(days=day)
+            upto = len(picks) * (day + 1) // days
+            day_sales = []
+            for sold_at, n, quantity in zip(day_times(rng, day_start, upto - done), picks[done:upto], quantities[done:upto]):
+                product = catalogue[n]
+                day_sales.append(Sale(
+                    product=product, quantity=quantity, price_per_unit=product.selling_price,
+                    cost_per_unit=product.buying_price, cost_amount=product.buying_price * quantity,
+                    amount=product.selling_price * quantity, sold_by=user, sold_at=sold_at,
+                ))
+            done = upto
+            Sale.objects.bulk_create(day_sales, batch_size=batch_size)
+            StockMovement.objects.bulk_create((
+                StockMovement(product_id=s.product_id, kind=StockMovement.SALE, quantity=-s.quantity,
+                              reference=s.pk, created_at=s.sold_at)
+                for s in day_sales
+            ), batch_size=batch_size)
+
+            due = expenses * (day + 1) // days
+            day_expenses = [
+                Expense(description=f"{rng.choice(EXPENSE_KINDS)} {day_start:%Y-%m-%d}",
+                        amount=money(rng.randrange(5000, 500000, 500)), spent_by=user, spent_at=spent_at)
+                for spent_at in day_times(rng, day_start, due - expensed)
+            ]
+            expensed = due
+            Expense.objects.bulk_create(day_expenses, batch_size=batch_size)
+
+            DailySummary.record_many(
+                [(s.sold_at, s.product_id, s.summary_values()) for s in day_sales]
+                + [(e.spent_at, None, {'expenses_total': e.amount}) for e in day_expenses]
+            )
+
+        Totals.rebuild()
+        TableVersion.bump(Product, Purchase, Sale, Expense, User)
+        search.touch()  # bulk writes skip the signals; rebuild the prefix index lazily
+        barcodes.touch()
+
+    return {'products': len(catalogue), 'purchases': len(purchases), 'sales': done, 'expenses': expensed}
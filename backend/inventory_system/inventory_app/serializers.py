@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import User, Product, Purchase, Sale, Expense, Report, Setting
+from . import barcodes
+from .models import User, Product, Purchase, Sale, Expense, Report, Setting, StockAlert, StockMovement
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
 
@@ -49,6 +50,31 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_total_value(self, obj):
         return obj.total_value
 
+
+class ProductSearchSerializer(serializers.ModelSerializer):
+    """Just what the POS picker shows."""
+    class Meta:
+        model = Product
+        fields = ['id', 'sku', 'name', 'category', 'selling_price', 'quantity']
+
+class ProductCodeSerializer(serializers.ModelSerializer):
+    """What a barcode scan returns; also renders the cached rows from barcodes.lookup()."""
+    class Meta:
+        model = Product
+        fields = list(barcodes.CODE_FIELDS)
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = StockAlert
+        fields = ['id', 'product', 'product_name', 'kind', 'quantity', 'reorder_level', 'created_at']
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'kind', 'quantity', 'reference', 'created_at']
+
 # ---------------------
 # Purchase Serializer
 # ---------------------
@@ -86,29 +112,75 @@ class SaleSerializer(serializers.ModelSerializer):
         decimal_places=2,
         read_only=True
     )
+    sku = serializers.CharField(write_only=True, required=False)  # scanned code instead of product id
 
     class Meta:
         model = Sale
         fields = [
-            'id', 'product', 'product_name', 'selling_price',
-            'quantity', 'price_per_unit', 'amount',
+            'id', 'product', 'sku', 'product_name', 'selling_price',
+            'quantity', 'price_per_unit', 'cost_per_unit', 'cost_amount', 'amount',
             'sold_by', 'sold_by_username', 'sold_at'
         ]
+        read_only_fields = ['cost_per_unit', 'cost_amount']
+        extra_kwargs = {'product': {'required': False}}
 
     def get_amount(self, obj):
         return obj.amount
 
     def validate(self, data):
+        code = data.pop('sku', None)
+        if code is not None:
+            data['product'] = Product.objects.filter(sku=code).first()
+            if data['product'] is None:
+                raise serializers.ValidationError({'sku': f"No product with code '{code}'."})
+        elif 'product' not in data:
+            raise serializers.ValidationError({'product': 'Give a product id or a sku.'})
+
         product = data['product']
         quantity_requested = data['quantity']
 
-        if product.quantity < quantity_requested:
+        # An edit only needs the extra units on top of what the sale already took
+        available = product.quantity
+        if self.instance and self.instance.product_id == product.id:
+            available += self.instance.quantity
+
+        if available < quantity_requested:
             raise serializers.ValidationError({
-                'quantity': f"Insufficient stock. Only {product.quantity} items available."
+                'quantity': f"Insufficient stock. Only {available} items available."
             })
 
         return data
 
+# ---------------------
+# Checkout Serializer (Multi-line Cart)
+# ---------------------
+class CheckoutItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False)
+    quantity = serializers.IntegerField(min_value=1)
+    price_per_unit = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def validate(self, data):
+        if ('product' in data) == ('sku' in data):
+            raise serializers.ValidationError('Give either a product id or a sku.')
+        return data
+
+
+class CheckoutSerializer(serializers.Serializer):
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        # Scanned codes become product ids, mostly straight from the code cache;
+        # the sku stays on the item so checkout can confirm it under the lock
+        ids = barcodes.product_ids({item['sku'] for item in items if 'sku' in item})
+        unknown = sorted({item['sku'] for item in items if 'sku' in item} - set(ids))
+        if unknown:
+            raise serializers.ValidationError([f"No product with code '{code}'." for code in unknown])
+        for item in items:
+            if 'sku' in item:
+                item['product'] = ids[item['sku']]
+        return items
+
 # ---------------------
 # Expense Serializer
 # ---------------------
@@ -0,0 +1,110 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from . import authentication, barcodes, config, live, metrics, search
+from .models import (
+    User, Product, Purchase, Sale, Expense, Report, Setting, Totals, DailySummary, TableVersion,
+    records_created,
+)
+
+# ---------------------
+# Running Totals + Daily Summaries
+# ---------------------
+# Creates and edits are handled in each model's save(); deletes are handled
+# here so cascades and queryset deletes keep the totals in step as well.
+
+def negated(values):
+    return {field: -value for field, value in values.items()}
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    # Before the cascade takes its cost layers with it
+    Totals.apply_product(instance, sign=-1, inventory_value=-instance.total_value)
+
+
+@receiver(post_delete, sender=Purchase)
+def purchase_deleted(sender, instance, **kwargs):
+    Totals.bump(total_purchases=-instance.amount)
+    DailySummary.record_many([(instance.purchased_at, instance.product_id, negated(instance.summary_values()))], create=False)
+
+
+@receiver(post_delete, sender=Sale)
+def sale_deleted(sender, instance, **kwargs):
+    Totals.bump(total_sales=-instance.amount, cogs=-instance.cogs)
+    DailySummary.record_many([(instance.sold_at, instance.product_id, negated(instance.summary_values()))], create=False)
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    Totals.bump(total_expenses=-instance.amount)
+    DailySummary.record_many([(instance.spent_at, None, {'expenses_total': -instance.amount})], create=False)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        Totals.bump(user_count=1)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    Totals.bump(user_count=-1)
+
+
+# ---------------------
+# Table Versions
+# ---------------------
+VERSIONED_MODELS = (Product, Sale, Purchase, Expense, Setting, Report, User)
+
+
+def bump_table_version(sender, **kwargs):
+    TableVersion.bump(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_table_version, sender=model, dispatch_uid=f'table-version-save-{model.__name__}')
+    post_delete.connect(bump_table_version, sender=model, dispatch_uid=f'table-version-delete-{model.__name__}')
+
+
+# ---------------------
+# Product Search Index
+# ---------------------
+post_save.connect(search.product_saved, sender=Product, dispatch_uid='product-search-save')
+post_delete.connect(search.product_deleted, sender=Product, dispatch_uid='product-search-delete')
+
+
+# ---------------------
+# Product Code Cache
+# ---------------------
+post_save.connect(barcodes.product_changed, sender=Product, dispatch_uid='product-code-save')
+post_delete.connect(barcodes.product_changed, sender=Product, dispatch_uid='product-code-delete')
+
+
+# ---------------------
+# Settings Cache
+# ---------------------
+post_save.connect(config.setting_changed, sender=Setting, dispatch_uid='settings-cache-save')
+post_delete.connect(config.setting_changed, sender=Setting, dispatch_uid='settings-cache-delete')
+
+
+# ---------------------
+# Auth Cache
+# ---------------------
+post_save.connect(authentication.user_changed, sender=User, dispatch_uid='auth-user-save')
+post_delete.connect(authentication.user_changed, sender=User, dispatch_uid='auth-user-delete')
+
+
+# ---------------------
+# Live Dashboard Feed
+# ---------------------
+for model in (Sale, Purchase, Expense):
+    post_save.connect(live.record_saved, sender=model, dispatch_uid=f'live-feed-save-{model.__name__}')
+    post_delete.connect(live.record_deleted, sender=model, dispatch_uid=f'live-feed-delete-{model.__name__}')
+records_created.connect(live.records_created, dispatch_uid='live-feed-bulk')
+
+
+# ---------------------
+# Request Metrics
+# ---------------------
+connection_created.connect(metrics.connection_created, dispatch_uid='request-metrics-queries')
@@ -0,0 +1,69 @@
+import threading
+import time
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connection, OperationalError
+from .models import Product, Sale
+
+
+def run_sale_stress(threads=8, attempts=50, stock=200, retries=20):
+    """Hammer one product from ``threads`` tills at once.
+
+    Every till tries ``attempts`` single-unit sales. Returns the counts the
+    caller needs to check for oversells, plus throughput in sales/second.
+    The product and its sales are removed afterwards."""
+    product = Product.objects.create(
+        name='stress-test product', quantity=stock,
+        buying_price=Decimal('1.00'), selling_price=Decimal('2.00'),
+    )
+    sold = []
+    rejected = []
+    start_barrier = threading.Barrier(threads)
+
+    def till():
+        local_sold = local_rejected = 0
+        try:
+            till_product = Product.objects.get(pk=product.pk)
+            start_barrier.wait()
+            for _ in range(attempts):
+                for attempt in range(retries):
+                    try:
+                        Sale(product=till_product, quantity=1, price_per_unit=Decimal('2.00')).save()
+                        local_sold += 1
+                    except ValidationError:
+                        local_rejected += 1
+                    except OperationalError:
+                        # SQLite reports writer contention as "database is locked"
+                        time.sleep(0.001 * (attempt + 1))
+                        continue
+                    break
+        finally:
+            sold.append(local_sold)
+            rejected.append(local_rejected)
+            connection.close()
+
+    workers = [threading.Thread(target=till) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    product.refresh_from_db()
+    result = {
+        'threads': threads,
+        'attempts': threads * attempts,
+        'stock': stock,
+        'sold': sum(sold),
+        'rejected': sum(rejected),
+        'sale_rows': Sale.objects.filter(product=product).count(),
+        'final_quantity': product.quantity,
+        'seconds': round(elapsed, 3),
+        'sales_per_second': round(sum(sold) / elapsed, 1) if elapsed else 0,
+    }
+    result['oversold'] = result['final_quantity'] < 0 or result['sale_rows'] > stock
+    result['lost_updates'] = stock - result['sale_rows'] != result['final_quantity']
+
+    product.delete()
+    return result
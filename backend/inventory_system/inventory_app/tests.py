@@ -1,3 +1,1091 @@
-from django.test import TestCase
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from . import authentication, barcodes, config, live, metrics, report_pdf, response_cache, search
+from .authentication import ClaimsTokenObtainPairSerializer
+from .importers import InventoryImporter, iter_rows
+from .models import (
+    Product, Purchase, Sale, Expense, Report, Setting, Totals, User, DailySummary, TableVersion,
+    StockMovement, StockSnapshot, CostLayer, TokenRevocation, ReportPdf,
+)
+from .benchmarks import ENDPOINTS, run_endpoint_suite, throwaway_user
+from .pagination import KeysetPagination
+from .seeding import seed_bench
+from .stress import run_sale_stress
 
-# Create your tests here.
+
+# ---------------------
+# Stock Concurrency
+# ---------------------
+class StockMutationTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Soda', quantity=3, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+
+    def test_sale_rejects_more_than_stored_stock_even_with_stale_instance(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Sale.objects.create(product=self.product, quantity=3, price_per_unit=Decimal('800'))
+
+        with self.assertRaises(ValidationError):
+            Sale.objects.create(product=stale, quantity=1, price_per_unit=Decimal('800'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+    def test_editing_a_sale_only_moves_the_difference(self):
+        sale = Sale.objects.create(product=self.product, quantity=1, price_per_unit=Decimal('800'))
+        sale.quantity = 2
+        sale.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+
+    def test_saving_a_stale_product_keeps_sales_made_since_it_loaded(self):
+        self.product.change_stock(7)  # 10 on hand
+        stale = Product.objects.get(pk=self.product.pk)
+        Sale.objects.create(product=self.product, quantity=3, price_per_unit=Decimal('800'))
+
+        stale.name = 'Cola'
+        stale.save()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 7)
+
+        stale.quantity += 5  # a stock-take adding five moves the stored value by five
+        stale.save()
+        self.assertEqual(stale.quantity, 12)
+        ledger = StockMovement.objects.filter(product=self.product).aggregate(total=Sum('quantity'))['total']
+        self.assertEqual(Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk), ledger)
+
+        stale.quantity -= 20
+        with self.assertRaises(ValidationError):
+            stale.save()
+
+
+class PurchaseEditTests(TestCase):
+    def test_reducing_a_purchase_below_what_was_sold_is_a_400(self):
+        user = User.objects.create_user('clerk', is_staff_user=True)
+        client = APIClient()
+        client.force_authenticate(user)
+        product = Product.objects.create(name='Soda', buying_price=Decimal('500'), selling_price=Decimal('800'))
+        purchase = Purchase.objects.create(product=product, quantity=10, price_per_unit=Decimal('500'))
+        Sale.objects.create(product=product, quantity=9, price_per_unit=Decimal('800'))
+
+        response = client.patch(f'/api/purchases/{purchase.pk}/', {'product': product.pk, 'quantity': 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already been sold', response.json()['quantity'][0])
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 1)
+
+
+class ConcurrentSaleStressTest(TransactionTestCase):
+    def test_concurrent_tills_never_oversell(self):
+        result = run_sale_stress(threads=4, attempts=15, stock=40)
+        self.assertFalse(result['oversold'], result)
+        self.assertFalse(result['lost_updates'], result)
+        self.assertEqual(result['sold'], 40)
+
+
+# ---------------------
+# Running Totals
+# ---------------------
+class RunningTotalsTests(TestCase):
+    FIELDS = ('total_sales', 'total_purchases', 'total_expenses', 'cogs', 'inventory_value',
+              'low_stock_count', 'product_count', 'user_count')
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='x', is_admin=True)
+        self.product = Product.objects.create(
+            name='Soda', quantity=10, buying_price=Decimal('500'), selling_price=Decimal('800'), reorder_level=2,
+        )
+
+    def assert_in_step(self):
+        stored = Totals.objects.get()
+        values = {field: getattr(stored, field) for field in self.FIELDS}
+        rebuilt = Totals.rebuild()
+        self.assertEqual(values, {field: getattr(rebuilt, field) for field in self.FIELDS})
+        return stored
+
+    def test_creates_edits_and_deletes_move_the_row_like_a_rebuild(self):
+        Purchase.objects.create(product=self.product, quantity=5, price_per_unit=Decimal('500'))
+        sale = Sale.objects.create(product=self.product, quantity=4, price_per_unit=Decimal('800'))
+        expense = Expense.objects.create(description='Rent', amount=Decimal('300'))
+        totals = self.assert_in_step()
+        self.assertEqual(
+            (totals.total_sales, totals.cogs, totals.total_expenses, totals.total_purchases),
+            (Decimal('3200'), Decimal('2000'), Decimal('300'), Decimal('2500')),
+        )
+
+        sale.quantity = 13
+        sale.save()
+        expense.amount = Decimal('450')
+        expense.save()
+        self.product.refresh_from_db()
+        self.product.reorder_level = 5
+        self.product.save()
+        totals = self.assert_in_step()
+        self.assertEqual((totals.total_sales, totals.low_stock_count), (Decimal('10400'), 1))
+
+        sale.delete()
+        expense.delete()
+        self.assert_in_step()
+        Product.objects.create(name='Bread', quantity=1, buying_price=Decimal('100'))
+        self.product.delete()
+        self.assertEqual(self.assert_in_step().product_count, 1)
+
+    def test_a_save_after_refresh_from_db_applies_deltas_from_the_refreshed_values(self):
+        sale = Sale.objects.create(product=self.product, quantity=1, price_per_unit=Decimal('800'))
+        elsewhere = Sale.objects.get(pk=sale.pk)
+        elsewhere.quantity = 3
+        elsewhere.save()
+
+        sale.refresh_from_db()
+        sale.quantity = 2
+        sale.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 8)
+        self.assertEqual(self.assert_in_step().total_sales, Decimal('1600'))
+
+    def test_overview_reads_the_stored_row_instead_of_aggregating(self):
+        cache.clear()
+        Sale.objects.create(product=self.product, quantity=1, price_per_unit=Decimal('800'))
+        Totals.objects.update(total_sales=Decimal('999'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        stats = client.get('/api/overview/').json()['stats']
+        self.assertEqual(Decimal(stats['total_sales']), Decimal('999'))
+        self.assertEqual(stats['total_products'], 1)
+
+
+# ---------------------
+# Sale Cost Snapshot
+# ---------------------
+class SaleCostTests(TestCase):
+    def setUp(self):
+        self.soda = Product.objects.create(
+            name='Soda', quantity=10, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+        self.bread = Product.objects.create(
+            name='Bread', quantity=5, buying_price=Decimal('120'), selling_price=Decimal('200'),
+        )
+
+    def test_unit_cost_is_fixed_at_sale_time(self):
+        sale = Sale.objects.create(product=self.soda, quantity=2, price_per_unit=Decimal('800'))
+        self.assertEqual((sale.cost_per_unit, sale.cost_amount), (Decimal('500'), Decimal('1000')))
+
+        self.soda.refresh_from_db()
+        self.soda.buying_price = Decimal('700')
+        self.soda.save()
+        sale = Sale.objects.get(pk=sale.pk)
+        sale.price_per_unit = Decimal('850')  # an edit that doesn't touch the quantity keeps the cost
+        sale.save()
+
+        sale.refresh_from_db()
+        self.assertEqual((sale.cost_per_unit, sale.cost_amount), (Decimal('500'), Decimal('1000')))
+        self.assertEqual(Sale.objects.cogs(), Decimal('1000'))
+
+    def test_database_cogs_matches_a_hand_calculation(self):
+        Sale.objects.create(product=self.soda, quantity=2, price_per_unit=Decimal('800'))
+        Sale.objects.create(product=self.bread, quantity=3, price_per_unit=Decimal('200'))
+        Sale.objects.create(product=self.soda, quantity=1, price_per_unit=Decimal('750'))
+        expected = 2 * Decimal('500') + 3 * Decimal('120') + 1 * Decimal('500')
+
+        self.assertEqual(Sale.objects.cogs(), expected)
+        self.assertEqual(Sale.objects.filter(product=self.soda).cogs(), Decimal('1500'))
+        self.assertEqual(Sale.objects.between(end=timezone.now() - timedelta(days=1)).cogs(), Decimal('0'))
+        self.assertEqual(Totals.current().cogs, expected)
+        self.assertEqual(Totals.current().net_profit, Decimal('2950') - expected)
+
+
+# ---------------------
+# List Paging + Filters
+# ---------------------
+class ListPagingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='x', is_staff_user=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Soda', quantity=50, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+
+    def sell_at(self, moment):
+        sale = Sale.objects.create(product=self.product, quantity=1, price_per_unit=Decimal('800'))
+        Sale.objects.filter(pk=sale.pk).update(sold_at=moment)
+        return sale.pk
+
+    def test_cursor_pages_walk_forward_and_back_through_ties(self):
+        noon = timezone.make_aware(datetime(2025, 9, 5, 12, 0))
+        ids = [self.sell_at(noon) for _ in range(4)] + [self.sell_at(noon - timedelta(hours=1)) for _ in range(3)]
+        expected = sorted(ids[:4], reverse=True) + sorted(ids[4:], reverse=True)
+
+        pages, url = [], '/api/sales/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            pages.append([row['id'] for row in page['results']])
+            url = page['next']
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+        backwards, url = [], page['previous']
+        while url:
+            page = self.client.get(url).json()
+            backwards.append([row['id'] for row in page['results']])
+            url = page['previous']
+        self.assertEqual(backwards, pages[-2::-1])
+
+        default = self.client.get('/api/sales/').json()  # paged even when no size is asked for
+        self.assertEqual(len(default['results']), 7)
+        with mock.patch.object(KeysetPagination, 'page_size', 3):
+            self.assertEqual(len(self.client.get('/api/sales/').json()['results']), 3)
+        with mock.patch.object(KeysetPagination, 'max_page_size', 2):
+            self.assertEqual(len(self.client.get('/api/sales/?page_size=100000').json()['results']), 2)  # capped
+
+    def test_from_and_to_dates_include_the_whole_local_day(self):
+        day = datetime(2025, 9, 5)
+        before = self.sell_at(timezone.make_aware(day - timedelta(minutes=1)))
+        first = self.sell_at(timezone.make_aware(day))
+        last = self.sell_at(timezone.make_aware(day + timedelta(hours=23, minutes=59)))
+        after = self.sell_at(timezone.make_aware(day + timedelta(days=1)))
+
+        def ids(query):
+            return {row['id'] for row in self.client.get(f'/api/sales/?{query}').json()['results']}
+
+        self.assertEqual(ids('from=2025-09-05&to=2025-09-05'), {first, last})
+        self.assertEqual(ids('to=2025-09-05'), {before, first, last})
+        self.assertEqual(ids('from=2025-09-06'), {after})
+        self.assertEqual(ids('from=2025-09-05T12:00:00%2B03:00'), {last, after})
+        self.assertEqual(self.client.get('/api/sales/?to=05/09/2025').status_code, 400)
+
+
+# ---------------------
+# Cart Checkout
+# ---------------------
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('till', password='x', is_staff_user=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.products = [
+            Product.objects.create(
+                name=f'Item {i}', quantity=10, buying_price=Decimal('100'), selling_price=Decimal('150'),
+            )
+            for i in range(30)
+        ]
+
+    def test_thirty_item_basket_uses_a_handful_of_queries(self):
+        items = [{'product': p.pk, 'quantity': 2} for p in self.products]
+        with self.assertNumQueries(14):  # includes the day's summary rows, the ledger rows and the cost layers
+            response = self.client.post('/api/sales/checkout/', {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Sale.objects.count(), 30)
+        self.assertEqual(set(Product.objects.values_list('quantity', flat=True)), {8})
+        self.assertEqual(Totals.current().total_sales, Decimal('9000'))
+        self.assertEqual(Totals.current().cogs, Decimal('6000'))
+
+    def test_short_stock_rejects_the_whole_cart(self):
+        items = [
+            {'product': self.products[0].pk, 'quantity': 6},
+            {'product': self.products[0].pk, 'quantity': 6},
+            {'product': self.products[1].pk, 'quantity': 1},
+        ]
+        response = self.client.post('/api/sales/checkout/', {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Sale.objects.count(), 0)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).quantity, 10)
+
+
+# ---------------------
+# Bulk Import
+# ---------------------
+class InventoryImportTests(TestCase):
+    def test_csv_rows_are_imported_in_batches_with_a_per_row_error_report(self):
+        lines = [
+            'name,category,buying_price,selling_price,quantity\n',
+            'Soda,drinks,500,800,24\n',
+            'Bread,bakery,not-a-price,1500,\n',
+            'Rice,food,2000,2600,\n',
+        ]
+        report = InventoryImporter('products', batch_size=2).run(iter_rows(lines, 'csv'))
+
+        self.assertEqual((report['created'], report['purchases'], report['error_count']), (2, 1, 1))
+        self.assertEqual(report['errors'][0]['row'], 3)
+        self.assertEqual(Product.objects.get(name='Soda').quantity, 24)
+        self.assertEqual(Totals.current().inventory_value, Totals.rebuild().inventory_value)
+
+
+# ---------------------
+# Streaming Export
+# ---------------------
+class ExportTests(TestCase):
+    def test_sales_export_streams_filtered_csv(self):
+        user = User.objects.create_user('accountant', password='x')
+        client = APIClient()
+        client.force_authenticate(user)
+        product = Product.objects.create(
+            name='Soda', quantity=5, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+        Sale.objects.create(product=product, quantity=2, price_per_unit=Decimal('800'), sold_by=user)
+
+        response = client.get('/api/sales/export/?from=2000-01-01')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(',Soda,,2,800.00,500.00,1600.00,accountant'))
+        empty = client.get('/api/sales/export/?to=2000-01-01')
+        self.assertEqual(len(b''.join(empty.streaming_content).splitlines()), 1)
+
+
+# ---------------------
+# Query Budgets
+# ---------------------
+class QueryBudgetTests(TestCase):
+    """Each endpoint must run a fixed number of queries however many rows
+    it returns. Raise a budget only when an endpoint genuinely needs it."""
+    budgets = {
+        '/api/products/': 2,
+        '/api/purchases/': 2,
+        '/api/sales/': 2,
+        '/api/expenses/': 2,
+        '/api/reports/': 2,
+        '/api/settings/': 2,
+        '/api/users/': 2,
+        '/api/overview/': 5,
+        '/api/sales/?page_size=5': 2,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='x', is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for i in range(count):
+            self.rows += 1
+            user = User.objects.create(username=f'clerk{self.rows}')
+            product = Product.objects.create(
+                name=f'Item {self.rows}', quantity=10, category='general',
+                buying_price=Decimal('100'), selling_price=Decimal('150'),
+            )
+            Purchase.objects.create(product=product, quantity=5, price_per_unit=Decimal('100'), purchased_by=user)
+            Sale.objects.create(product=product, quantity=1, price_per_unit=Decimal('150'), sold_by=user)
+            Expense.objects.create(description=f'Expense {self.rows}', amount=Decimal('10'), spent_by=user)
+            Report.objects.create(generated_by=user)
+            Setting.objects.create(key=f'key{self.rows}', value='1')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_endpoints_stay_within_a_flat_query_budget(self):
+        for rows in (2, 20):
+            self.add_rows(rows - self.rows)
+            for url, budget in self.budgets.items():
+                with self.subTest(url=url, rows=rows):
+                    self.assertEqual(self.count_queries(url), budget)
+
+
+# ---------------------
+# Token Claims
+# ---------------------
+class TokenClaimsTests(TestCase):
+    def setUp(self):
+        self.fresh_process()  # counters restart with each test's rollback
+        self.admin = User.objects.create_user('boss', password='pw-boss-123', is_admin=True, is_staff=True)
+        self.clerk = User.objects.create_user('clerk', password='pw-clerk-123', is_staff_user=True)
+
+    def bearer(self, username, password):
+        client = APIClient()
+        token = client.post('/api/token/', {'username': username, 'password': password}).json()['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def fresh_process(self):
+        # What another worker sees: an empty cache and nothing loaded yet
+        cache.clear()
+        authentication.users.clear()
+        authentication.state.update(generation=None, revoked={})
+        authentication.version.value = None
+
+    def test_requests_authenticate_from_claims_until_the_user_changes(self):
+        clerk = self.bearer('clerk', 'pw-clerk-123')
+        clerk.get('/api/products/')  # loads this process's revocations once
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(clerk.get('/api/products/').status_code, 200)
+        self.assertFalse([q for q in queries if 'inventory_app_user' in q['sql']])
+
+        admin = self.bearer('boss', 'pw-boss-123')
+        response = admin.patch(f'/api/users/{self.clerk.pk}/', {'is_staff_user': False, 'is_active': False})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(clerk.get('/api/products/').status_code, 401)  # old claims no longer trusted
+
+    def test_revocation_reaches_other_processes(self):
+        clerk = self.bearer('clerk', 'pw-clerk-123')
+        self.assertEqual(clerk.get('/api/products/').status_code, 200)
+        admin = self.bearer('boss', 'pw-boss-123')
+        admin.patch(f'/api/users/{self.clerk.pk}/', {'is_active': False})
+
+        self.fresh_process()
+        self.assertEqual(clerk.get('/api/products/').status_code, 401)
+
+    def test_warm_process_notices_a_revocation_made_elsewhere(self):
+        clerk = self.bearer('clerk', 'pw-clerk-123')
+        self.assertEqual(clerk.get('/api/products/').status_code, 200)
+        # Another worker deactivates the clerk; only the database changes here
+        User.objects.filter(pk=self.clerk.pk).update(is_active=False)
+        TokenRevocation.objects.create(user_id=self.clerk.pk)
+        TableVersion.bump_counter('auth-users')
+        authentication.version.checked_at = 0  # the check interval has passed
+        self.assertEqual(clerk.get('/api/products/').status_code, 401)
+
+    def test_deleting_a_user_revokes_their_tokens(self):
+        clerk = self.bearer('clerk', 'pw-clerk-123')
+        self.assertEqual(clerk.get('/api/overview/').status_code, 200)
+        admin = self.bearer('boss', 'pw-boss-123')
+        self.assertEqual(admin.delete(f'/api/users/{self.clerk.pk}/').status_code, 204)
+
+        self.assertEqual(clerk.get('/api/products/').status_code, 401)
+        self.assertEqual(clerk.post('/api/expenses/', {'description': 'Tea', 'amount': '5'}).status_code, 401)
+        self.fresh_process()
+        self.assertEqual(clerk.get('/api/overview/').status_code, 401)
+
+
+# ---------------------
+# Async Read Path
+# ---------------------
+class AsyncReadPathTests(TestCase):
+    def setUp(self):
+        self.clerk = User.objects.create_user('clerk', is_staff_user=True)
+        product = Product.objects.create(name='Bolt', quantity=5, buying_price=Decimal('1.00'), selling_price=Decimal('2.00'))
+        Sale.objects.create(product=product, quantity=2, price_per_unit=Decimal('2.00'), sold_by=self.clerk)
+        token = ClaimsTokenObtainPairSerializer.get_token(self.clerk).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def test_async_endpoints_match_the_sync_ones(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get('/api/async/overview/')).status_code, 401)
+
+        for sync_path, async_path in [('/api/overview/', '/api/async/overview/'), ('/api/sales/', '/api/async/sales/')]:
+            expected = await self.sync_get(sync_path)
+            response = await client.get(async_path, headers=self.headers)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json(), expected)
+
+        response = await client.get('/api/async/report_dates/', headers=self.headers)
+        self.assertEqual(response.status_code, 403)  # admin only, as on the sync path
+
+    async def sync_get(self, path):
+        def get():
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+            return client.get(path).json()
+        return await sync_to_async(get)()
+
+
+# ---------------------
+# Load Benchmark
+# ---------------------
+class LoadBenchmarkTests(TestCase):
+    def test_seeded_data_is_consistent_and_every_endpoint_is_measured(self):
+        counts = seed_bench(products=6, sales=120, days=4, seed=7)
+        self.assertEqual(counts, {'products': 6, 'purchases': 6, 'sales': 120, 'expenses': 4})
+        self.assertEqual(seed_bench(products=6, sales=120, days=4, seed=7), counts)  # repeatable
+
+        stored = Totals.objects.get()
+        rebuilt = Totals.rebuild()
+        for field in ('total_sales', 'total_purchases', 'total_expenses', 'cogs', 'inventory_value', 'low_stock_count'):
+            self.assertEqual(getattr(stored, field), getattr(rebuilt, field), field)
+        for product in Product.objects.all():
+            moved = StockMovement.objects.filter(product=product).aggregate(total=Sum('quantity'))['total']
+            self.assertEqual(moved, product.quantity)
+        days = DailySummary.objects.filter(product__isnull=True)
+        self.assertEqual(days.count(), 4)  # the opening purchases land on the first day of sales
+        self.assertEqual(days.aggregate(total=Sum('sales_total'))['total'], stored.total_sales)
+        self.assertLess(Sale.objects.earliest('sold_at').sold_at, timezone.now() - timedelta(days=3))
+
+        results = run_endpoint_suite(rounds=1)
+        self.assertEqual(list(results), [endpoint[0] for endpoint in ENDPOINTS])
+        for name, result in results.items():
+            self.assertGreater(result['queries'], 0, name)
+            self.assertGreater(result['peak_memory_kb'], 0, name)
+            self.assertEqual(result['requests'], 1, name)
+
+    def test_benchmark_users_never_touch_existing_accounts(self):
+        existing = User.objects.create_user('bench-reader')
+        with throwaway_user() as user:
+            self.assertNotEqual(user.username, existing.username)
+            self.assertTrue(user.is_admin)
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+        self.assertTrue(User.objects.filter(pk=existing.pk).exists())
+
+
+# ---------------------
+# Live Dashboard Feed
+# ---------------------
+class LiveFeedTests(TestCase):
+    def setUp(self):
+        self.clerk = User.objects.create_user('clerk', is_staff_user=True)
+        self.product = Product.objects.create(name='Bolt', quantity=5, buying_price=Decimal('1.00'), selling_price=Decimal('2.00'))
+
+    def test_one_event_per_write_reaches_every_dashboard_on_every_worker(self):
+        broker, loop = live.LocalBroker(), asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        workers = [live.Hub(), live.Hub()]
+        for hub in workers:
+            hub.connect(broker)
+        streams = [hub.open(loop) for hub in workers for _ in range(3)]
+
+        with mock.patch.object(live, '_broker', broker), mock.patch.object(broker, 'publish', wraps=broker.publish) as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Sale.checkout([{'product': self.product.pk, 'quantity': 2}, {'product': self.product.pk, 'quantity': 1}], sold_by=self.clerk)
+        loop.run_until_complete(asyncio.sleep(0))
+
+        self.assertEqual(publish.call_count, 1)
+        event = publish.call_args.args[0]
+        self.assertEqual(event['stats']['total_sales'], Decimal('6.00'))
+        self.assertEqual(len(event['recent']), 2)
+        for queue in streams:
+            self.assertEqual(queue.qsize(), 1)
+            self.assertTrue(queue.get_nowait().startswith(b'event: update\n'))
+
+    def test_postgres_listener_reconnects_after_losing_its_connection(self):
+        import psycopg2
+
+        class Stop(Exception):
+            pass
+
+        broker, conn = live.PostgresBroker(), mock.Mock()
+        connects = [psycopg2.OperationalError('refused'), psycopg2.OperationalError('refused'), conn, Stop()]
+        with mock.patch.object(broker, 'connect', side_effect=connects), \
+                mock.patch.object(broker, 'relay', side_effect=psycopg2.InterfaceError('connection already closed')), \
+                mock.patch.object(live.time, 'sleep') as sleep, \
+                self.assertLogs('inventory_app.live', 'WARNING') as logs, \
+                self.assertRaises(Stop):
+            broker.listen()
+
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2, 1])  # backs off, resets once connected
+        conn.close.assert_called_once()
+        self.assertEqual(len(logs.records), 3)
+
+    async def test_stream_opens_with_the_overview(self):
+        token = await sync_to_async(lambda: str(ClaimsTokenObtainPairSerializer.get_token(self.clerk).access_token))()
+        response = await AsyncClient().get(f'/api/async/overview/stream/?token={token}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = aiter(response.streaming_content)
+        self.assertTrue((await anext(frames)).startswith(b'retry:'))
+        self.assertIn(b'"total_products":1', await anext(frames))
+        await frames.aclose()
+
+
+# ---------------------
+# Conditional GETs
+# ---------------------
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='x', is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Rice', quantity=5, buying_price=Decimal('100'), selling_price=Decimal('150'),
+        )
+
+    def test_unchanged_tables_answer_304_from_the_version_row(self):
+        etag = self.client.get('/api/products/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.product.change_stock(-1)
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# ---------------------
+# Product Search
+# ---------------------
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search.index.generation = None  # force a rebuild from this test's rows
+        self.user = User.objects.create_user('clerk', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name, category in [('Basmati', 'rice'), ('Rice Flour', 'baking'), ('Brown Rice', 'grains'), ('Oil', 'cooking')]:
+            Product.objects.create(name=name, category=category, buying_price=Decimal('1'))
+
+    def names(self, query):
+        return [row['name'] for row in self.client.get('/api/products/search/', {'q': query}).json()]
+
+    def test_ranked_by_name_prefix_then_name_word_then_category(self):
+        self.assertEqual(self.names('ric'), ['Rice Flour', 'Brown Rice', 'Basmati'])
+        self.assertEqual(self.names('rice brown'), ['Brown Rice'])
+        self.assertEqual(self.names(''), [])
+
+    def test_index_follows_product_writes(self):
+        self.names('oil')  # build the index
+        Product.objects.filter(name='Oil').get().delete()
+        Product.objects.create(name='Olive Oil', category='cooking', buying_price=Decimal('1'))
+        self.assertEqual(self.names('oil'), ['Olive Oil'])
+        self.assertEqual(Product.objects.search('oil').get().name, 'Olive Oil')
+
+    def test_index_follows_writes_from_other_processes(self):
+        self.names('oil')
+        # Another worker renames a product; only the database counter moves
+        Product.objects.filter(name='Oil').update(name='Ghee')
+        TableVersion.bump_counter('product-search')
+        search.version.checked_at = 0  # the check interval has passed
+        self.assertEqual(self.names('ghee'), ['Ghee'])
+        self.assertEqual(self.names('oil'), [])
+
+
+# ---------------------
+# Barcodes
+# ---------------------
+class BarcodeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        barcodes.codes.clear()
+        self.user = User.objects.create_user('clerk', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Soda', sku='6001234', quantity=10, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+
+    def test_scan_is_one_lookup_then_cached_until_the_product_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/products/by-code/6001234/').json()['name'], 'Soda')
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/by-code/6001234/')
+
+        self.product.selling_price = Decimal('900')
+        self.product.save()
+        self.assertEqual(self.client.get('/api/products/by-code/6001234/').json()['selling_price'], '900.00')
+        self.assertEqual(self.client.get('/api/products/by-code/missing/').status_code, 404)
+
+    def test_sales_and_checkout_accept_a_code(self):
+        response = self.client.post('/api/sales/', {'sku': '6001234', 'quantity': 2, 'price_per_unit': '800'})
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client.post('/api/sales/checkout/', {'items': [{'sku': '6001234', 'quantity': 3}]}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+        response = self.client.post('/api/sales/checkout/', {'items': [{'sku': 'nope', 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_codes_follow_changes_from_other_processes(self):
+        self.client.get('/api/products/by-code/6001234/')
+        Product.objects.filter(pk=self.product.pk).update(selling_price=Decimal('950'))
+        TableVersion.bump_counter('product-codes')
+        barcodes.version.checked_at = 0
+        self.assertEqual(self.client.get('/api/products/by-code/6001234/').json()['selling_price'], '950.00')
+
+    def test_checkout_refuses_a_code_reassigned_since_it_was_cached(self):
+        other = Product.objects.create(name='Water', sku='6009999', quantity=10, buying_price=Decimal('200'))
+        self.client.get('/api/products/by-code/6001234/')
+        # Another worker moves the code to a different product, within the check interval
+        Product.objects.filter(pk=self.product.pk).update(sku='6000000')
+        Product.objects.filter(pk=other.pk).update(sku='6001234')
+
+        response = self.client.post('/api/sales/checkout/', {'items': [{'sku': '6001234', 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'items': ["Product code '6001234' has changed; scan it again."]})
+        self.assertFalse(Sale.objects.exists())
+
+
+# ---------------------
+# Low Stock
+# ---------------------
+class LowStockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_alerts_fire_only_when_the_reorder_level_is_crossed(self):
+        Setting.objects.create(key='default_reorder_level', value='3')
+        self.addCleanup(config.settings_cache.invalidate)  # the row goes with the test transaction
+        soap = Product.objects.create(name='Soap', quantity=5, buying_price=Decimal('1'), selling_price=Decimal('2'))
+        Product.objects.create(name='Salt', quantity=50, buying_price=Decimal('1'))
+        self.assertEqual(soap.reorder_level, 3)
+
+        for quantity in (2, 1):  # 5 -> 3 crosses, 3 -> 2 is already low
+            Sale.objects.create(product=soap, quantity=quantity, price_per_unit=Decimal('2'), sold_by=self.user)
+        Purchase.objects.create(product=soap, quantity=10, price_per_unit=Decimal('1'), purchased_by=self.user)
+
+        alerts = self.client.get('/api/products/alerts/').json()
+        self.assertEqual([(a['kind'], a['quantity']) for a in alerts], [('low', 3), ('restocked', 12)])
+        self.assertEqual(self.client.get('/api/products/alerts/', {'after': alerts[0]['id']}).json(), alerts[1:])
+
+        Sale.checkout([{'product': soap.pk, 'quantity': 10}], sold_by=self.user)
+        self.assertEqual([p['name'] for p in self.client.get('/api/products/low_stock/').json()], ['Soap'])
+        self.assertEqual(Totals.current().low_stock_count, Totals.rebuild().low_stock_count)
+
+
+# ---------------------
+# Stock Ledger
+# ---------------------
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ledger_adds_up_and_answers_point_in_time_queries(self):
+        soap = Product.objects.create(name='Soap', quantity=5, buying_price=Decimal('1'), selling_price=Decimal('2'))
+        Purchase.objects.create(product=soap, quantity=10, price_per_unit=Decimal('1'), purchased_by=self.user)
+        sale = Sale.objects.create(product=soap, quantity=4, price_per_unit=Decimal('2'), sold_by=self.user)
+        Sale.checkout([{'product': soap.pk, 'quantity': 2}], sold_by=self.user)
+        self.assertEqual(self.client.delete(f'/api/sales/{sale.pk}/').status_code, 204)
+        soap.refresh_from_db()
+        soap.quantity = 11  # stock-take found two missing
+        soap.save()
+
+        # Spread the rows over six days so each one starts a new day
+        movements = list(StockMovement.objects.filter(product=soap).order_by('id'))
+        self.assertEqual([(m.kind, m.quantity) for m in movements], [
+            ('adjustment', 5), ('purchase', 10), ('sale', -4), ('sale', -2), ('reversal', 4), ('adjustment', -2),
+        ])
+        start = timezone.now() - timedelta(days=10)
+        for day, movement in enumerate(movements):
+            StockMovement.objects.filter(pk=movement.pk).update(created_at=start + timedelta(days=day))
+        on = lambda day: (start + timedelta(days=day)).isoformat()
+
+        expected = [0, 5, 15, 11, 9, 13, 11]
+        self.assertEqual([StockMovement.quantity_before(soap.pk, start + timedelta(days=d, hours=1)) for d in range(-1, 6)], expected)
+        self.assertEqual(len(StockSnapshot.take(settle=timedelta(days=7))), 1)  # covers the first three rows
+        self.assertEqual([StockMovement.quantity_before(soap.pk, start + timedelta(days=d, hours=1)) for d in range(-1, 6)], expected)
+
+        history = self.client.get(f'/api/products/{soap.pk}/stock_history/', {'from': on(2), 'to': on(4)}).json()
+        self.assertEqual((history['opening_quantity'], history['closing_quantity']), (15, 9))
+        self.assertEqual([(m['kind'], m['balance']) for m in history['movements']], [('sale', 11), ('sale', 9)])
+        at = self.client.get(f'/api/products/{soap.pk}/stock_history/', {'at': on(2)}).json()
+        self.assertEqual(at['quantity'], 15)
+
+        # Pages follow the cursor, each carrying the running balance on
+        url, pages = f'/api/products/{soap.pk}/stock_history/?page_size=4&from={on(1)[:10]}', []
+        while url:
+            page = self.client.get(url).json()
+            pages.append([(m['kind'], m['balance']) for m in page['movements']])
+            url = page['next']
+        self.assertEqual(pages, [
+            [('purchase', 15), ('sale', 11), ('sale', 9), ('reversal', 13)], [('adjustment', 11)],
+        ])
+        previous = self.client.get(page['previous']).json()
+        self.assertEqual([m['balance'] for m in previous['movements']], [15, 11, 9, 13])
+
+
+# ---------------------
+# Inventory Costing
+# ---------------------
+class CostingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(config.settings_cache.invalidate)
+
+    def receive(self, product, *lots):
+        for quantity, price in lots:
+            Purchase.objects.create(product=product, quantity=quantity, price_per_unit=Decimal(price), purchased_by=self.user)
+
+    def assertStockValue(self, product, value):
+        self.assertEqual(self.client.get(f'/api/products/{product.pk}/').json()['total_value'], float(value))
+        self.assertEqual(Totals.current().inventory_value, Decimal(value))
+        self.assertEqual(Totals.rebuild().inventory_value, Decimal(value))
+
+    def test_fifo_uses_the_oldest_layers_first(self):
+        flour = Product.objects.create(name='Flour', buying_price=Decimal('10'), selling_price=Decimal('30'))
+        self.receive(flour, (5, '10'), (5, '20'))
+        sale = Sale.objects.create(product=flour, quantity=7, price_per_unit=Decimal('30'), sold_by=self.user)
+        self.assertEqual((sale.cost_amount, sale.cost_per_unit), (Decimal('90.00'), Decimal('12.86')))
+        self.assertStockValue(flour, '60.00')
+
+        self.assertEqual(self.client.delete(f'/api/sales/{sale.pk}/').status_code, 204)
+        self.assertStockValue(flour, '150.00')  # the seven units went back at what they cost
+        [sale] = Sale.checkout([{'product': flour.pk, 'quantity': 9}], sold_by=self.user)
+        self.assertEqual(sale.cost_amount, Decimal('137.14'))  # 3 left at 20, then 6 of the returned 7
+        self.assertEqual(Totals.current().cogs, Totals.rebuild().cogs)
+
+    def test_moving_average_reprices_on_each_receipt(self):
+        Setting.objects.create(key='costing_method', value='average')
+        sugar = Product.objects.create(name='Sugar', quantity=2, buying_price=Decimal('10'), selling_price=Decimal('30'))
+        self.receive(sugar, (6, '20'), (2, '25'))  # 2@10 + 6@20 = 8@17.50, then + 2@25 = 10@19
+        self.assertEqual(CostLayer.objects.filter(product=sugar, remaining__gt=0).count(), 1)
+
+        sale = Sale.objects.create(product=sugar, quantity=4, price_per_unit=Decimal('30'), sold_by=self.user)
+        self.assertEqual(sale.cost_amount, Decimal('76.00'))
+        self.assertStockValue(sugar, '114.00')
+
+
+# ---------------------
+# Settings Cache
+# ---------------------
+class SettingsCacheTests(TestCase):
+    def setUp(self):
+        config.settings_cache.invalidate()
+        self.addCleanup(config.settings_cache.invalidate)
+        Setting.objects.create(key='tax_rate', value='0.18')
+        Setting.objects.create(key='vat_enabled', value='yes')
+        Setting.objects.create(key='tiers', value='[1, 5, 10]')
+
+    def test_typed_reads_cost_no_queries_between_version_checks(self):
+        config.get('tax_rate')
+        with self.assertNumQueries(0):
+            self.assertEqual(config.get_decimal('tax_rate'), Decimal('0.18'))
+            self.assertIs(config.get_bool('vat_enabled'), True)
+            self.assertEqual(config.get_json('tiers'), [1, 5, 10])
+            self.assertEqual(config.get_int('tax_rate', 7), 7)  # doesn't parse
+            self.assertIsNone(config.get('missing'))
+
+    def test_write_in_another_worker_is_seen_at_the_next_version_check(self):
+        config.get('tax_rate')
+        Setting.objects.filter(key='tax_rate').update(value='0.2')  # no signals, like another process
+        TableVersion.bump(Setting)
+        self.assertEqual(config.get_decimal('tax_rate'), Decimal('0.18'))
+        config.settings_cache.checked_at -= config.CHECK_INTERVAL
+        self.assertEqual(config.get_decimal('tax_rate'), Decimal('0.2'))
+
+
+# ---------------------
+# Response Cache
+# ---------------------
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='x', is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_overview_is_served_from_cache_until_a_write(self):
+        first = self.client.get('/api/overview/').json()
+        with self.assertNumQueries(1):  # only the table-version lookup for the ETag
+            self.assertEqual(self.client.get('/api/overview/').json(), first)
+
+        Expense.objects.create(description='Rent', amount=Decimal('50'), spent_by=self.user)
+        refreshed = self.client.get('/api/overview/').json()
+        self.assertEqual(Decimal(refreshed['stats']['total_expenses']), Decimal('50'))
+        self.assertEqual(response_cache.stats()['overview'], {'hits': 1, 'misses': 2, 'shared': 0})
+
+    def test_writes_from_other_processes_are_never_served_stale(self):
+        first = self.client.get('/api/overview/')
+        # Another worker's write: rows and versions change, no signal here
+        with mock.patch('inventory_app.models.tables_changed.send'):
+            Expense.objects.create(description='Rent', amount=Decimal('50'), spent_by=self.user)
+        response = self.client.get('/api/overview/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['stats']['total_expenses']), Decimal('50'))
+        again = self.client.get('/api/overview/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+
+# ---------------------
+# Request Metrics
+# ---------------------
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+
+    def test_requests_are_counted_per_route_and_exported_to_admins_only(self):
+        clerk = User.objects.create_user('clerk', is_staff_user=True)
+        Product.objects.create(name='Bolt', quantity=5, buying_price=Decimal('1.00'), selling_price=Decimal('2.00'))
+        self.client.force_authenticate(clerk)
+        body = self.client.get('/api/products/').content
+        self.client.get('/api/products/')
+        self.client.get('/api/no-such-page/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('boss', is_staff=True))
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        route = 'route="product-list",method="GET"'
+        self.assertIn(f'invento_http_requests_total{{{route},status="200"}} 2', text)
+        self.assertIn(f'invento_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 2', text)
+        self.assertIn(f'invento_http_request_duration_seconds_count{{{route}}} 2', text)
+        self.assertIn(f'invento_http_db_queries_total{{{route}}} 4', text)  # version lookup + rows, twice
+        self.assertIn(f'invento_http_response_bytes_total{{{route}}} {2 * len(body)}', text)
+        self.assertIn('route="metrics",method="GET",status="403"} 1', text)
+        self.assertNotIn('no-such-page', text)  # labelled by URL pattern, never by raw path
+
+
+# ---------------------
+# Report Metrics
+# ---------------------
+class ReportMetricsTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Soda', quantity=10, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+        Purchase.objects.create(product=self.product, quantity=4, price_per_unit=Decimal('500'))
+        Sale.objects.create(product=self.product, quantity=3, price_per_unit=Decimal('800'))
+        Expense.objects.create(description='Rent', amount=Decimal('200'))
+
+    def metrics(self, report):
+        report.refresh_from_db()
+        return {field: getattr(report, field) for field in Report.METRIC_FIELDS}
+
+    def test_full_run_is_one_select_and_one_update(self):
+        report = Report.objects.create()
+        with self.assertNumQueries(3):  # plus the report table's version bump
+            report.generate_all_metrics()
+
+        self.assertEqual(self.metrics(report), {
+            'total_sales': Decimal('2400'),
+            'total_purchases': Decimal('2000'),
+            'total_expenses': Decimal('200'),
+            'net_profit': Decimal('2400') - 3 * Decimal('500') - Decimal('200'),
+            'total_product_price': 11 * Decimal('500'),
+        })
+
+    def test_incremental_run_counts_each_row_once(self):
+        first = Report.objects.create()
+        # Recorded after the first report's row but before its aggregation ran
+        Sale.objects.create(product=self.product, quantity=2, price_per_unit=Decimal('900'))
+        first.generate_all_metrics()
+        self.assertEqual(self.metrics(first)['total_sales'], Decimal('2400'))
+
+        Expense.objects.create(description='Power', amount=Decimal('50'))
+        second = Report.objects.create()
+        second.generate_all_metrics(incremental=True)
+        full = Report.objects.create()
+        full.generate_all_metrics()
+
+        self.assertEqual(self.metrics(second)['total_sales'], Decimal('4200'))
+        self.assertEqual(
+            {field: value for field, value in self.metrics(second).items() if field != 'total_product_price'},
+            {field: value for field, value in self.metrics(full).items() if field != 'total_product_price'},
+        )
+
+
+# ---------------------
+# Report Dates
+# ---------------------
+class ReportDatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for moment in ('2025-09-01T10:00Z', '2025-09-01T22:30Z', '2025-09-02T08:00Z', '2025-09-05T08:00Z'):
+            report = Report.objects.create(generated_by=self.user)
+            Report.objects.filter(pk=report.pk).update(generated_at=parse_datetime(moment))
+
+    def test_dates_are_distinct_local_days(self):
+        # 22:30 UTC is already the next day in Dar es Salaam
+        self.assertEqual(self.client.get('/api/report_dates/').json()['dates'], ['2025-09-01', '2025-09-02', '2025-09-05'])
+        self.assertEqual(self.client.get('/api/report_dates/?to=2025-09-02&limit=1').json()['dates'], ['2025-09-02'])
+        self.assertEqual(len(self.client.get('/api/reports/?date=2025-09-02').json()['results']), 2)
+
+
+# ---------------------
+# Daily Summaries
+# ---------------------
+class DailySummaryTests(TestCase):
+    def snapshot(self):
+        return sorted(
+            (row.date, row.product_id or 0, *(getattr(row, f) for f in DailySummary.VALUE_FIELDS))
+            for row in DailySummary.objects.all()
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        product = Product.objects.create(
+            name='Soda', quantity=0, buying_price=Decimal('500'), selling_price=Decimal('800'),
+        )
+        Purchase.objects.create(product=product, quantity=10, price_per_unit=Decimal('500'))
+        product.refresh_from_db()
+        sale = Sale.objects.create(product=product, quantity=2, price_per_unit=Decimal('800'))
+        sale.quantity = 3
+        sale.save()
+        Sale.checkout([{'product': product.pk, 'quantity': 1}])
+        Expense.objects.create(description='Rent', amount=Decimal('100'))
+        Sale.objects.create(product=product, quantity=1, price_per_unit=Decimal('800')).delete()
+
+        incremental = self.snapshot()
+        DailySummary.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('owner', password='x'))
+        series = client.get('/api/analytics/timeseries/?granularity=month').data['series']
+        self.assertEqual(len(series), 1)
+        self.assertEqual(Decimal(str(series[0]['sales_total'])), Decimal('3200'))
+
+
+# ---------------------
+# Report PDF Cache
+# ---------------------
+class ReportPdfCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('boss', password='x', is_staff=True))
+        self.report = Report.objects.create(notes='First draft')
+
+    def test_summary_pdf_is_rendered_once_per_report_version(self):
+        url = f'/api/reports/{self.report.pk}/export_pdf/'
+        first = self.client.get(url)
+        self.assertEqual(first['Content-Type'], 'application/pdf')
+        self.assertIsNotNone(report_pdf.cached_pdf(self.report))
+
+        self.client.patch(f'/api/reports/{self.report.pk}/', {'notes': 'Final'}, format='json')
+        self.assertIsNone(report_pdf.cached_pdf(self.report))
+        self.report.refresh_from_db()
+        self.assertIsNone(report_pdf.cached_pdf(self.report))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def queue(self):
+        with mock.patch.object(report_pdf, 'get_executor') as executor, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(f'/api/reports/{self.report.pk}/export_pdf/', {'detailed': 1})
+        return response, executor.return_value.submit
+
+    def status(self):
+        return self.client.get(f'/api/reports/{self.report.pk}/pdf_status/').json()['status']
+
+    def test_detailed_pdf_is_rendered_once_in_the_background(self):
+        self.assertEqual(self.status(), 'missing')
+        response, submit = self.queue()
+        self.assertEqual((response.status_code, response.json()), (202, {'status': 'pending'}))
+        submit.assert_called_once_with(report_pdf.run_job, self.report.pk, report_pdf.content_hash(self.report))
+        _, again = self.queue()  # already under way, in this worker or any other
+        again.assert_not_called()
+
+        report_pdf.finish_job(*submit.call_args.args[1:])
+        self.assertEqual(self.status(), 'ready')
+        response = self.client.get(f'/api/reports/{self.report.pk}/export_pdf/', {'detailed': 1})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_failed_and_expired_jobs_are_reported_and_restarted(self):
+        _, submit = self.queue()
+        with mock.patch.object(report_pdf, 'render', side_effect=RuntimeError('boom')), \
+                self.assertLogs('inventory_app.report_pdf', 'ERROR'):
+            report_pdf.finish_job(*submit.call_args.args[1:])
+        self.assertEqual(self.status(), 'failed')
+        _, submit = self.queue()
+        submit.assert_called_once()
+
+        # The worker running it died: the job stays pending until it times out
+        ReportPdf.objects.update(started_at=timezone.now() - report_pdf.JOB_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(self.status(), 'expired')
+        _, submit = self.queue()
+        submit.assert_called_once()
+        self.assertEqual(self.status(), 'pending')
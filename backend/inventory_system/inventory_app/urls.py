@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     ProductViewSet, PurchaseViewSet, SaleViewSet,
     ExpenseViewSet, ReportViewSet, SettingViewSet,
-    UserViewSet, UserRegisterView, overview, report_dates,
+    UserViewSet, UserRegisterView, overview, report_dates, timeseries, cache_stats, request_metrics,
 )
 
 router = DefaultRouter()
@@ -19,5 +20,12 @@ urlpatterns = [
     path('register/', UserRegisterView.as_view(), name='register'),
     path('overview/', overview, name='overview'),
     path('report_dates/', report_dates, name='report-dates'),
+    path('analytics/timeseries/', timeseries, name='analytics-timeseries'),
+    path('cache_stats/', cache_stats, name='cache-stats'),
+    path('metrics/', request_metrics, name='metrics'),
+    path('async/overview/', async_views.overview, name='async-overview'),
+    path('async/overview/stream/', async_views.overview_stream, name='async-overview-stream'),
+    path('async/report_dates/', async_views.report_dates, name='async-report-dates'),
+    path('async/<str:resource>/', async_views.record_list, name='async-list'),
     path('', include(router.urls)),  # ✅ expose /api/products/, etc.
 ]
\ No newline at end of file
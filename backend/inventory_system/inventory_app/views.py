@@ -1,19 +1,35 @@
-from django.db.models import Sum, F
+import codecs
+from contextlib import contextmanager
+from itertools import chain
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
 from django.shortcuts import render
-from rest_framework import viewsets, permissions
+from django.utils import timezone
+from rest_framework import viewsets, permissions, serializers, status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
-from .models import Product, Purchase, Sale, Expense, Report, Setting, User
+from .conditional import ConditionalGetMixin, conditional_on
+from .exporters import export_response
+from .filters import parse_date_bound, parse_query_date
+from .importers import InventoryImporter, iter_rows, guess_format
+from .live import activity_entry, dashboard_stats
+from .pagination import KeysetPagination
+from . import barcodes, metrics, report_pdf, response_cache
+from .response_cache import cached_response
+from .search import search_products
+from .models import Product, Purchase, Sale, Expense, Report, Setting, User, Totals, DailySummary, StockAlert, StockMovement
 from .serializers import (
     UserSerializer, UserRegisterSerializer,
-    ProductSerializer, PurchaseSerializer,
+    ProductSerializer, ProductSearchSerializer, ProductCodeSerializer, StockAlertSerializer, StockMovementSerializer,
+    PurchaseSerializer,
     SaleSerializer, ExpenseSerializer,
-    ReportSerializer, SettingSerializer
+    ReportSerializer, SettingSerializer,
+    CheckoutSerializer,
 )
 from django.http import HttpResponse
-from reportlab.lib.pagesizes import A4  # pyright: ignore[reportMissingModuleSource]
-from reportlab.pdfgen import canvas     # pyright: ignore[reportMissingModuleSource]
-from io import BytesIO
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.generics import CreateAPIView
@@ -33,6 +49,49 @@ class IsAdminOrStaff(permissions.BasePermission):
             request.user.is_admin or request.user.is_staff_user
         )
 
+def query_flag(request, name):
+    return request.query_params.get(name, '').lower() in ('1', 'true', 'yes')
+
+# ---------------------
+# Stock Errors
+# ---------------------
+PURCHASE_STOCK_ERROR = "Part of this purchase has already been sold; it can't be reduced below what is left in stock."
+
+
+@contextmanager
+def stock_errors_as_validation(message=None):
+    # Stock is re-checked under the row lock; report a lost race as a 400,
+    # worded for the caller when ``message`` is given.
+    try:
+        yield
+    except DjangoValidationError as exc:
+        raise serializers.ValidationError({'quantity': [message] if message else exc.messages})
+
+# ---------------------
+# Bulk Import
+# ---------------------
+def import_upload(request, kind):
+    upload = request.FILES.get('file')
+    if upload is None:
+        raise serializers.ValidationError({'file': 'Upload a CSV or NDJSON file as "file".'})
+    fmt = request.query_params.get('type') or guess_format(upload.name, upload.content_type or '')
+    lines = codecs.iterdecode(upload, 'utf-8-sig')
+    report = InventoryImporter(kind, user=request.user).run(iter_rows(lines, fmt))
+    return Response(report, status=status.HTTP_200_OK)
+
+# ---------------------
+# Streaming Export
+# ---------------------
+class ExportMixin:
+    """``GET <list>/export/?type=csv|ndjson`` honouring the list filters."""
+    export_fields = ()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).order_by(self.date_field, 'id')
+        fmt = 'ndjson' if request.query_params.get('type') == 'ndjson' else 'csv'
+        return export_response(queryset, self.export_fields, fmt, filename=self.basename)
+
 # ---------------------
 # User Register View (Admin Only)
 # ---------------------
@@ -43,62 +102,203 @@ class UserRegisterView(CreateAPIView):
 # ---------------------
 # User List View
 # ---------------------
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = get_user_model().objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    cursor_ordering = ('id',)
+    etag_models = (User,)
 
 # ---------------------
 # Product ViewSet
 # ---------------------
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+SEARCH_LIMIT = 50
+ALERT_PAGE_SIZE = 200
+HISTORY_PAGE_SIZE = 500
+HISTORY_ORDERING = ('created_at', 'id')
+
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.with_stock_value()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrStaff]
+    cursor_ordering = ('id',)
+    filter_lookups = {'category': 'category'}
+    etag_models = (Product,)
+
+    def perform_update(self, serializer):
+        with stock_errors_as_validation("Not that much stock left to take off; reload the product and try again."):
+            serializer.save()
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def import_rows(self, request):
+        return import_upload(request, 'products')
+
+    @action(detail=False, methods=['get'])
+    def low_stock(self, request):
+        products = self.filter_queryset(Product.objects.with_stock_value().low_stock().order_by('id'))
+        return Response(ProductSerializer(products, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        """Threshold crossings after ``?after=<alert id>``, oldest first."""
+        after = request.query_params.get('after', '0')
+        if not after.isdigit():
+            raise serializers.ValidationError({'after': 'Expected an alert id.'})
+        alerts = StockAlert.objects.select_related('product').filter(pk__gt=int(after)).order_by('id')[:ALERT_PAGE_SIZE]
+        return Response(StockAlertSerializer(alerts, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path=r'by-code/(?P<code>[^/]+)')
+    def by_code(self, request, code=None):
+        product = barcodes.lookup(code)
+        if product is None:
+            raise NotFound(f"No product with code '{code}'.")
+        return Response(ProductCodeSerializer(product).data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        limit = request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= SEARCH_LIMIT:
+            raise serializers.ValidationError({'limit': f'Expected a whole number from 1 to {SEARCH_LIMIT}.'})
+        products = search_products(query, int(limit)) if query else []
+        return Response(ProductSearchSerializer(products, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def stock_history(self, request, pk=None):
+        """``?at=`` gives the stock at that moment (a date means its end).
+        Otherwise the ledger for ``?from=&to=``, oldest first with the
+        running balance, plus the window's opening and closing quantities,
+        ``HISTORY_PAGE_SIZE`` rows a page behind ``next``/``previous`` cursors."""
+        product = self.get_object()
+        params = request.query_params
+
+        if params.get('at'):
+            at = parse_date_bound(params['at'], 'at', end=True)
+            return Response({
+                'product': product.pk,
+                'at': at,
+                'quantity': StockMovement.quantity_before(product.pk, at),
+            })
+
+        start = parse_date_bound(params.get('from'), 'from')
+        end = parse_date_bound(params.get('to'), 'to', end=True)
+        window = StockMovement.objects.filter(product=product)
+        if start:
+            window = window.filter(created_at__gte=start)
+        if end:
+            window = window.filter(created_at__lt=end)
+        paginator = KeysetPagination()
+        paginator.ordering, paginator.page_size = HISTORY_ORDERING, HISTORY_PAGE_SIZE
+        movements = paginator.paginate_queryset(window, request)
+
+        opening = StockMovement.quantity_before(product.pk, start) if start else 0
+        balance = opening
+        if movements and paginator.cursor:  # a later page carries on from the rows before it
+            first = [getattr(movements[0], field) for field in HISTORY_ORDERING]
+            earlier = window.filter(KeysetPagination.after(('-created_at', '-id'), first))
+            balance += earlier.aggregate(total=Sum('quantity'))['total'] or 0
+        rows = []
+        for movement, row in zip(movements, StockMovementSerializer(movements, many=True).data):
+            balance += movement.quantity
+            rows.append({**row, 'balance': balance})
+        return Response({
+            'product': product.pk,
+            'opening_quantity': opening,
+            'closing_quantity': StockMovement.quantity_before(product.pk, end) if end else product.quantity,
+            'movements': rows,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        })
 
 # ---------------------
 # Purchase ViewSet
 # ---------------------
-class PurchaseViewSet(viewsets.ModelViewSet):
-    queryset = Purchase.objects.all()
+class PurchaseViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Purchase.objects.select_related('product', 'purchased_by')
     serializer_class = PurchaseSerializer
     permission_classes = [IsAdminOrStaff]
+    cursor_ordering = ('-purchased_at', '-id')
+    date_field = 'purchased_at'
+    etag_models = (Purchase, Product, User)
+    filter_lookups = {'product': 'product_id', 'category': 'product__category'}
+    export_fields = (
+        'id', 'purchased_at', 'product_id', 'product__name', 'product__category',
+        'quantity', 'price_per_unit', 'amount', 'purchased_by__username',
+    )
 
     def perform_create(self, serializer):
-        serializer.save(purchased_by=self.request.user)
+        with stock_errors_as_validation(PURCHASE_STOCK_ERROR):
+            serializer.save(purchased_by=self.request.user)
+
+    def perform_update(self, serializer):
+        with stock_errors_as_validation(PURCHASE_STOCK_ERROR):
+            serializer.save()
 
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        product = instance.product
-        product.quantity = max(product.quantity - instance.quantity, 0)
-        product.save()
-        return super().destroy(request, *args, **kwargs)
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def import_rows(self, request):
+        return import_upload(request, 'purchases')
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.product.change_stock(
+                -instance.quantity, clamp=True, kind=StockMovement.REVERSAL, reference=instance.pk,
+            )
+            instance.delete()
 
 # ---------------------
 # Sale ViewSet
 # ---------------------
-class SaleViewSet(viewsets.ModelViewSet):
-    queryset = Sale.objects.all()
+class SaleViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Sale.objects.select_related('product', 'sold_by')
     serializer_class = SaleSerializer
     permission_classes = [IsAdminOrStaff]
+    cursor_ordering = ('-sold_at', '-id')
+    date_field = 'sold_at'
+    etag_models = (Sale, Product, User)
+    filter_lookups = {'product': 'product_id', 'category': 'product__category'}
+    export_fields = (
+        'id', 'sold_at', 'product_id', 'product__name', 'product__category',
+        'quantity', 'price_per_unit', 'cost_per_unit', 'amount', 'sold_by__username',
+    )
 
     def perform_create(self, serializer):
-        serializer.save(sold_by=self.request.user)
-
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        product = instance.product
-        product.quantity = max(product.quantity + instance.quantity, 0)
-        product.save()
-        return super().destroy(request, *args, **kwargs)
+        with stock_errors_as_validation():
+            serializer.save(sold_by=self.request.user)
+
+    def perform_update(self, serializer):
+        with stock_errors_as_validation():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.product.change_stock(
+                instance.quantity, kind=StockMovement.REVERSAL, reference=instance.pk,
+                unit_cost=instance.returned_unit_cost(),
+            )
+            instance.delete()
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            sales = Sale.checkout(serializer.validated_data['items'], sold_by=request.user)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({'items': exc.messages})
+        return Response(SaleSerializer(sales, many=True).data, status=status.HTTP_201_CREATED)
 
 # ---------------------
 # Expense ViewSet
 # ---------------------
-class ExpenseViewSet(viewsets.ModelViewSet):
-    queryset = Expense.objects.all()
+class ExpenseViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Expense.objects.select_related('spent_by')
     serializer_class = ExpenseSerializer
     permission_classes = [IsAdminOrStaff]
+    cursor_ordering = ('-spent_at', '-id')
+    date_field = 'spent_at'
+    etag_models = (Expense, User)
+    export_fields = ('id', 'spent_at', 'description', 'amount', 'spent_by__username')
 
     def perform_create(self, serializer):
         serializer.save(spent_by=self.request.user)
@@ -106,114 +306,131 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 # ---------------------
 # Report ViewSet
 # ---------------------
-class ReportViewSet(viewsets.ModelViewSet):
-    queryset = Report.objects.all()
+class ReportViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Report.objects.select_related('generated_by')
     serializer_class = ReportSerializer
     permission_classes = [IsAuthenticated]
+    date_field = 'generated_at'
+    etag_models = (Report, User)
 
     def get_queryset(self):
-        queryset = Report.objects.all()
+        queryset = super().get_queryset()
         date_str = self.request.query_params.get('date')
         if date_str:
-            queryset = queryset.filter(generated_at__date=date_str)
+            # A local-day range rather than generated_at__date, so report_generated_idx applies
+            parse_query_date(date_str, 'date')
+            queryset = queryset.filter(
+                generated_at__gte=parse_date_bound(date_str, 'date'),
+                generated_at__lt=parse_date_bound(date_str, 'date', end=True),
+            )
         return queryset
 
     def perform_create(self, serializer):
         report = serializer.save(generated_by=self.request.user)
-        report.generate_all_metrics()
+        report.generate_all_metrics(incremental=query_flag(self.request, 'incremental'))
+
+    def perform_update(self, serializer):
+        report_pdf.invalidate(serializer.instance)
+        serializer.save()
 
     @action(detail=True, methods=['get'], permission_classes=[IsAdminUser])
     def export_pdf(self, request, pk=None):
         report = self.get_object()
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, height - 50, f"📊 Financial Report #{report.id}")
-
-        p.setFont("Helvetica", 12)
-        p.drawString(50, height - 80, f"Generated By: {report.generated_by.username if report.generated_by else '—'}")
-        p.drawString(50, height - 100, f"Date: {report.generated_at.strftime('%Y-%m-%d %H:%M')}")
+        if not query_flag(request, 'detailed'):
+            return HttpResponse(report_pdf.render_cached(report), content_type='application/pdf')
 
-        y = height - 140
-        p.drawString(50, y, f"Total Sales: TSh {report.total_sales:,.2f}")
-        p.drawString(50, y - 20, f"Total Purchases: TSh {report.total_purchases:,.2f}")
-        p.drawString(50, y - 40, f"Total Expenses: TSh {report.total_expenses:,.2f}")
-        p.drawString(50, y - 60, f"Net Profit: TSh {report.net_profit:,.2f}")
-        p.drawString(50, y - 80, f"Total Product Value: TSh {report.total_product_price:,.2f}")
+        pdf = report_pdf.cached_pdf(report, detailed=True)
+        if pdf is None:
+            state = report_pdf.render_in_background(report)
+            return Response({'status': state}, status=status.HTTP_202_ACCEPTED)
+        return HttpResponse(pdf, content_type='application/pdf')
 
-        p.drawString(50, y - 120, "Notes:")
-        text_obj = p.beginText(50, y - 140)
-        text_obj.setFont("Helvetica-Oblique", 11)
-        for line in report.notes.splitlines():
-            text_obj.textLine(line)
-        p.drawText(text_obj)
-
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        return HttpResponse(buffer, content_type='application/pdf')
+    @action(detail=True, methods=['get'], permission_classes=[IsAdminUser])
+    def pdf_status(self, request, pk=None):
+        # Poll until "ready", then download from export_pdf/?detailed=1
+        return Response({'status': report_pdf.job_status(self.get_object())})
 
 # ---------------------
 # Setting ViewSet
 # ---------------------
-class SettingViewSet(viewsets.ModelViewSet):
+class SettingViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Setting.objects.all()
     serializer_class = SettingSerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    etag_models = (Setting,)
 
 # ---------------------
 # System Overview View
 # ---------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on(Sale, Purchase, Expense, Product, User)
+@cached_response('overview', depends_on=(Sale, Purchase, Expense, Product, User))
 def overview(request):
-    total_sales = Sale.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_expenses = Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_product_price = Product.objects.aggregate(
-        total=Sum(F('buying_price') * F('quantity'))
-    )['total'] or 0
-    low_stock_count = Product.objects.filter(quantity__lte=2).count()
-
-    # ✅ Calculate COGS
-    sales = Sale.objects.select_related('product').all()
-    cogs = sum(s.quantity * s.product.buying_price for s in sales)
-
-    # ✅ Net Profit = Sales - COGS - Expenses
-    net_profit = total_sales - cogs - total_expenses
-
-    total_purchases = Purchase.objects.aggregate(total=Sum('amount'))['total'] or 0
-
-    stats = {
-        'total_products': Product.objects.count(),
-        'total_users': User.objects.count(),
-        'total_sales': total_sales,
-        'total_purchases': total_purchases,
-        'total_expenses': total_expenses,
-        'net_profit': net_profit,
-        'total_product_price': total_product_price,
-        'low_stock_products': low_stock_count
+    sales, purchases, expenses = recent_activity_querysets()
+    return Response(overview_payload(Totals.current(), sales, purchases, expenses))
+
+
+def recent_activity_querysets():
+    recent_sales = Sale.objects.select_related('product').only(
+        'quantity', 'amount', 'product__name'
+    ).order_by('-sold_at')[:2]
+    recent_purchases = Purchase.objects.select_related('product').only(
+        'quantity', 'amount', 'product__name'
+    ).order_by('-purchased_at')[:2]
+    recent_expenses = Expense.objects.only('amount', 'description').order_by('-spent_at')[:1]
+    return recent_sales, recent_purchases, recent_expenses
+
+
+def overview_payload(totals, recent_sales, recent_purchases, recent_expenses):
+    """Shared by the sync and async overview views and the live feed."""
+    return {
+        'stats': dashboard_stats(totals),
+        'recent': [activity_entry(record) for record in chain(recent_sales, recent_purchases, recent_expenses)]
     }
 
-    recent_sales = Sale.objects.order_by('-sold_at')[:2]
-    recent_purchases = Purchase.objects.order_by('-purchased_at')[:2]
-    recent_expenses = Expense.objects.order_by('-spent_at')[:1]
-
-    recent = []
-
-    for sale in recent_sales:
-        recent.append(f"🛒 Sold {sale.quantity} × {sale.product.name} for {sale.amount} TZS")
+# ---------------------
+# Time Series Endpoint
+# ---------------------
+TIMESERIES_BUCKETS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
 
-    for purchase in recent_purchases:
-        recent.append(f"📦 Purchased {purchase.quantity} × {purchase.product.name} for {purchase.amount} TZS")
 
-    for expense in recent_expenses:
-        recent.append(f"💸 Spent {expense.amount} TZS on {expense.description}")
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_on(Sale, Purchase, Expense, Product)
+def timeseries(request):
+    params = request.query_params
+    granularity = params.get('granularity', 'day')
+    if granularity not in TIMESERIES_BUCKETS:
+        raise serializers.ValidationError({'granularity': 'Use day, week or month.'})
+
+    rows = DailySummary.objects.all()
+    if params.get('product'):
+        if not params['product'].isdigit():
+            raise serializers.ValidationError({'product': 'Expected a product id.'})
+        rows = rows.filter(product_id=params['product'])
+    elif params.get('category'):
+        rows = rows.filter(product__category=params['category'])
+    else:
+        rows = rows.filter(product__isnull=True)
+
+    if params.get('from'):
+        rows = rows.filter(date__gte=parse_query_date(params['from'], 'from'))
+    if params.get('to'):
+        rows = rows.filter(date__lte=parse_query_date(params['to'], 'to'))
+
+    truncate = TIMESERIES_BUCKETS[granularity]
+    rows = rows.annotate(bucket=truncate('date') if truncate else F('date'))
+    series = rows.values('bucket').annotate(
+        **{field: Sum(field) for field in DailySummary.VALUE_FIELDS}
+    ).order_by('bucket')
 
     return Response({
-        'stats': stats,
-        'recent': recent
+        'granularity': granularity,
+        'series': [
+            {'date': row.pop('bucket').isoformat(), **row, 'net_profit': row['sales_total'] - row['cogs'] - row['expenses_total']}
+            for row in series
+        ],
     })
 
 # ---------------------
@@ -221,11 +438,56 @@ def overview(request):
 # ---------------------
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@conditional_on(Report)
+@cached_response('report_dates', depends_on=(Report,))
 def report_dates(request):
-    dates = Report.objects.values_list('generated_at', flat=True)
-    unique_dates = sorted(set(dt.date() for dt in dates))
+    days, limit = report_days(request.query_params)
+    unique_dates = list(days[:limit])
+    if limit:
+        unique_dates.reverse()
     return Response({'dates': [d.isoformat() for d in unique_dates]})
 
+
+def report_days(params):
+    """Distinct local report dates as a queryset, plus the ``limit`` to slice
+    it with. With a limit the queryset runs newest first (the caller reverses),
+    so it keeps the most recent N."""
+    reports = Report.objects.all()
+    start = parse_date_bound(params.get('from'), 'from')
+    end = parse_date_bound(params.get('to'), 'to', end=True)
+    if start:
+        reports = reports.filter(generated_at__gte=start)
+    if end:
+        reports = reports.filter(generated_at__lt=end)
+
+    days = reports.annotate(
+        day=TruncDate('generated_at', tzinfo=timezone.get_current_timezone())
+    ).values_list('day', flat=True).distinct()
+
+    limit = params.get('limit')
+    if not limit:
+        return days.order_by('day'), None
+    if not limit.isdigit() or int(limit) < 1:
+        raise serializers.ValidationError({'limit': 'Expected a positive whole number.'})
+    return days.order_by('-day'), int(limit)
+
+# ---------------------
+# Response Cache Stats
+# ---------------------
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(response_cache.stats())
+
+# ---------------------
+# Request Metrics
+# ---------------------
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    # Prometheus text format; each worker process reports its own counters
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 # ---------------------
 # Frontend Entry Point
 # ---------------------
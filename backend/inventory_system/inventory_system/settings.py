@@ -360,6 +360,7 @@ INSTALLED_APPS = [
 # ---------------------
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',                  # ✅ Must be first for CORS to work
+    'inventory_app.metrics.MetricsMiddleware',                # ✅ Per-route latency/query counters for /api/metrics/
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',             # ✅ Serves static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -392,16 +393,40 @@ DATABASES = {
     )
 }
 
+# ---------------------
+# CACHING (local memory by default; point CACHE_BACKEND at a file/shared backend per deploy)
+# ---------------------
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'invento'),
+    }
+}
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+
+# Live dashboard feed; use inventory_app.live.PostgresBroker with several workers
+DASHBOARD_FEED_BROKER = os.environ.get('DASHBOARD_FEED_BROKER', 'inventory_app.live.LocalBroker')
+
 # ---------------------
 # REST FRAMEWORK
 # ---------------------
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'inventory_app.authentication.ClaimsJWTAuthentication',  # ✅ request.user from token claims, no per-request SELECT
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_FILTER_BACKENDS': (
+        'inventory_app.filters.RecordFilter',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'inventory_app.pagination.KeysetPagination',  # ✅ every list is paged; ?page_size= up to 500
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'inventory_app.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'inventory_app.authentication.ClaimsTokenRefreshSerializer',
 }
 
 # ---------------------
@@ -115,4 +115,23 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints answer one page at a time: { results, next, previous }.
+export const HISTORY_PAGE_SIZE = 100;
+
+export const fetchPage = async (url) => {
+  const response = await api.get(url);
+  return response.data;
+};
+
+// Follow `next` to the end; for the short lists a form needs whole (products, users, settings)
+export const fetchAll = async (url) => {
+  let rows = [];
+  while (url) {
+    const page = await fetchPage(url);
+    rows = rows.concat(page.results);
+    url = page.next;
+  }
+  return rows;
+};
+
 export default api;
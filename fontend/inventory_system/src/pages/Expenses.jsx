@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api';
+import api, { fetchPage, HISTORY_PAGE_SIZE } from '../api';
 import { toast } from 'react-toastify';
 import { useMediaQuery } from 'react-responsive';
 import 'bootstrap/dist/css/bootstrap.min.css';
@@ -7,6 +7,7 @@ import './Expenses.css';
 
 const Expenses = () => {
   const [expenses, setExpenses] = useState([]);
+  const [nextExpenses, setNextExpenses] = useState(null);
   const [newExpense, setNewExpense] = useState({ description: '', amount: '' });
   const [editExpense, setEditExpense] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
@@ -19,8 +20,19 @@ const Expenses = () => {
 
   const fetchExpenses = async () => {
     try {
-      const response = await api.get('expenses/');
-      setExpenses(response.data);
+      const page = await fetchPage(`expenses/?page_size=${HISTORY_PAGE_SIZE}`);
+      setExpenses(page.results);
+      setNextExpenses(page.next);
+    } catch (error) {
+      toast.error('❌ Failed to fetch expenses');
+    }
+  };
+
+  const loadMoreExpenses = async () => {
+    try {
+      const page = await fetchPage(nextExpenses);
+      setExpenses(prev => [...prev, ...page.results]);
+      setNextExpenses(page.next);
     } catch (error) {
       toast.error('❌ Failed to fetch expenses');
     }
@@ -35,7 +47,7 @@ const Expenses = () => {
   const handleCreateExpense = async () => {
     try {
       const response = await api.post('expenses/', newExpense);
-      setExpenses([...expenses, response.data]);
+      setExpenses([response.data, ...expenses]);
       setNewExpense({ description: '', amount: '' });
       toast.success('✅ Expense added');
     } catch (error) {
@@ -195,6 +207,12 @@ const Expenses = () => {
           </table>
         </div>
       )}
+
+      {nextExpenses && (
+        <div className="text-center my-3">
+          <button className="btn btn-outline-secondary" onClick={loadMoreExpenses}>Load more</button>
+        </div>
+      )}
     </div>
   );
 };
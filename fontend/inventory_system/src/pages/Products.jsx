@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api';
+import api, { fetchAll } from '../api';
 import { toast } from 'react-toastify';
 import { useMediaQuery } from 'react-responsive';
 import 'bootstrap/dist/css/bootstrap.min.css';
@@ -21,8 +21,7 @@ const Products = () => {
 
   const fetchProducts = async () => {
     try {
-      const response = await api.get('products/');
-      setProducts(response.data);
+      setProducts(await fetchAll('products/?page_size=500'));
     } catch (error) {
       toast.error('❌ Failed to fetch products');
     }
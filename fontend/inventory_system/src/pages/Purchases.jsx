@@ -1,11 +1,12 @@
 import React, { useEffect, useState } from 'react';
 import { useMediaQuery } from 'react-responsive';
-import api from '../api';
+import api, { fetchAll, fetchPage, HISTORY_PAGE_SIZE } from '../api';
 import { toast } from 'react-toastify';
 import 'bootstrap/dist/css/bootstrap.min.css';
 
 const Purchase = () => {
   const [purchases, setPurchases] = useState([]);
+  const [nextPurchases, setNextPurchases] = useState(null);
   const [products, setProducts] = useState([]);
   const [newPurchase, setNewPurchase] = useState({ product: '', quantity: '', price_per_unit: '' });
   const [editPurchase, setEditPurchase] = useState(null);
@@ -22,8 +23,19 @@ const Purchase = () => {
 
   const fetchPurchases = async () => {
     try {
-      const response = await api.get('purchases/');
-      setPurchases(response.data);
+      const page = await fetchPage(`purchases/?page_size=${HISTORY_PAGE_SIZE}`);
+      setPurchases(page.results);
+      setNextPurchases(page.next);
+    } catch (error) {
+      toast.error('❌ Failed to fetch purchases');
+    }
+  };
+
+  const loadMorePurchases = async () => {
+    try {
+      const page = await fetchPage(nextPurchases);
+      setPurchases(prev => [...prev, ...page.results]);
+      setNextPurchases(page.next);
     } catch (error) {
       toast.error('❌ Failed to fetch purchases');
     }
@@ -31,8 +43,7 @@ const Purchase = () => {
 
   const fetchProducts = async () => {
     try {
-      const response = await api.get('products/');
-      setProducts(response.data);
+      setProducts(await fetchAll('products/?page_size=500'));
     } catch (error) {
       toast.error('❌ Failed to fetch products');
     }
@@ -64,7 +75,7 @@ const Purchase = () => {
 
       const payload = { product, quantity, price_per_unit };
       const response = await api.post('purchases/', payload);
-      setPurchases([...purchases, response.data]);
+      setPurchases([response.data, ...purchases]);
       setNewPurchase({ product: '', quantity: '', price_per_unit: '' });
       setSelectedProduct(null);
       await fetchProducts();
@@ -279,6 +290,12 @@ const Purchase = () => {
         </>
       )}
 
+      {nextPurchases && (
+        <div className="text-center my-3">
+          <button className="btn btn-outline-secondary" onClick={loadMorePurchases}>Load more</button>
+        </div>
+      )}
+
       {/* Edit Purchase Form */}
       {editPurchase && (
         <div className="card p-3 mt-4">
@@ -29,8 +29,8 @@ const Reports = () => {
     if (!selectedDate) return;
     try {
       const response = await api.get(`reports/?date=${selectedDate}`);
-      if (response.data.length > 0) {
-        setReport(response.data[0]);
+      if (response.data.results.length > 0) {
+        setReport(response.data.results[0]);
         toast.info(`📅 Report loaded for ${selectedDate}`);
       } else {
         setReport(null);
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api';
+import api, { fetchAll, fetchPage, HISTORY_PAGE_SIZE } from '../api';
 import { toast } from 'react-toastify';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import { useMediaQuery } from 'react-responsive';
@@ -7,6 +7,7 @@ import './Sales.css';
 
 const Sales = () => {
   const [sales, setSales] = useState([]);
+  const [nextSales, setNextSales] = useState(null);
   const [filteredSales, setFilteredSales] = useState([]);
   const [products, setProducts] = useState([]);
   const [newSale, setNewSale] = useState({ product: '', quantity: '', price_per_unit: '' });
@@ -22,9 +23,22 @@ const Sales = () => {
 
   const fetchSales = async () => {
     try {
-      const response = await api.get('sales/');
-      setSales(response.data);
-      setFilteredSales(response.data);
+      const page = await fetchPage(`sales/?page_size=${HISTORY_PAGE_SIZE}`);
+      setSales(page.results);
+      setFilteredSales(page.results);
+      setNextSales(page.next);
+    } catch (error) {
+      toast.error('❌ Failed to fetch sales');
+    }
+  };
+
+  const loadMoreSales = async () => {
+    try {
+      const page = await fetchPage(nextSales);
+      const updated = [...sales, ...page.results];
+      setSales(updated);
+      setFilteredSales(updated);
+      setNextSales(page.next);
     } catch (error) {
       toast.error('❌ Failed to fetch sales');
     }
@@ -32,8 +46,7 @@ const Sales = () => {
 
   const fetchProducts = async () => {
     try {
-      const response = await api.get('products/');
-      setProducts(response.data);
+      setProducts(await fetchAll('products/?page_size=500'));
     } catch (error) {
       toast.error('❌ Failed to fetch products');
     }
@@ -72,7 +85,7 @@ const Sales = () => {
 
       const payload = { product, quantity, price_per_unit };
       const response = await api.post('sales/', payload);
-      const updated = [...sales, response.data];
+      const updated = [response.data, ...sales];
       setSales(updated);
       setFilteredSales(updated);
       setNewSale({ product: '', quantity: '', price_per_unit: '' });
@@ -303,6 +316,12 @@ const Sales = () => {
         </div>
       )}
 
+      {nextSales && (
+        <div className="text-center my-3">
+          <button className="btn btn-outline-secondary" onClick={loadMoreSales}>Load more</button>
+        </div>
+      )}
+
       {/* Edit Sale Form */}
       {editSale && (
         <div className="card p-3 mt-4 shadow-sm">
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api'; // Adjust path if necessary
+import { fetchAll } from '../api';
 
 const Settings = () => {
   const [settings, setSettings] = useState({});
@@ -7,8 +7,7 @@ const Settings = () => {
   useEffect(() => {
     const fetchSettings = async () => {
       try {
-        const response = await api.get('settings/');
-        setSettings(response.data);
+        setSettings(await fetchAll('settings/?page_size=500'));
       } catch (error) {
         console.error('Failed to fetch settings:', error);
       }
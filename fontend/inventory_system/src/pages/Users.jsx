@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api';
+import api, { fetchAll } from '../api';
 import { toast } from 'react-toastify';
 import './Users.css';
 
@@ -13,8 +13,7 @@ const Users = () => {
 
   const fetchUsers = async () => {
     try {
-      const response = await api.get('users/');
-      setUsers(response.data);
+      setUsers(await fetchAll('users/?page_size=500'));
     } catch (error) {
       console.error('Failed to fetch users:', error);
     }